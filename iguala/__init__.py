@@ -1,6 +1,23 @@
-from .helpers import is_not, match
+from .helpers import is_not, match, register
+from .index import Index
+from .live import LiveQuery, Observable, notify
 from .matchers import as_matcher, cond, extended, is_, regex
 from .paths import as_path
+from .patternset import PatternSet
 
-__ALL__ = ["match", "as_matcher", "as_path", "is_not", "cond", "regex", "extended"]
+__ALL__ = [
+    "match",
+    "as_matcher",
+    "as_path",
+    "is_not",
+    "cond",
+    "regex",
+    "extended",
+    "register",
+    "Index",
+    "LiveQuery",
+    "Observable",
+    "notify",
+    "PatternSet",
+]
 __version__ = "0.5.2"
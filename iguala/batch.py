@@ -0,0 +1,156 @@
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from itertools import islice
+from os import cpu_count
+from pickle import dumps, loads
+from uuid import uuid4
+
+from .matchers import Context, Matcher, MatcherResult
+
+# compiled patterns installed in a worker process, by key
+worker_patterns = {}
+max_worker_patterns = 16
+
+
+def match_many(matcher, objects):
+    compiled = matcher.compile()
+    match_context = compiled.match_context
+    matcher.check_variables()
+    for obj in objects:
+        result = MatcherResult()
+        result.add_contexts(match_context(obj, Context()))
+        yield obj, result
+
+
+def filter_many(matcher, objects):
+    compiled = matcher.compile()
+    return (obj for obj in objects if compiled.matches(obj))
+
+
+def install_pattern(key, payload):
+    if len(worker_patterns) >= max_worker_patterns:
+        del worker_patterns[next(iter(worker_patterns))]
+    worker_patterns[key] = loads(payload).compile()
+
+
+def worker_pattern(pattern):
+    # a matcher (threads), the key of a pattern installed by the pool
+    # initializer, or a (key, payload) pair for pools created elsewhere
+    if isinstance(pattern, Matcher):
+        return pattern.compile()
+    if isinstance(pattern, tuple):
+        key, payload = pattern
+        if key not in worker_patterns:
+            install_pattern(key, payload)
+        return worker_patterns[key]
+    return worker_patterns[pattern]
+
+
+def match_chunk(pattern, chunk):
+    return [result for _, result in match_many(worker_pattern(pattern), chunk)]
+
+
+def filter_chunk(pattern, chunk):
+    compiled = worker_pattern(pattern)
+    return [compiled.matches(obj) for obj in chunk]
+
+
+executors = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+
+def parallel_match_many(
+    matcher, objects, executor, chunksize=256, ordered=True, max_workers=None
+):
+    chunks = dispatch(
+        match_chunk, matcher, objects, executor, chunksize, ordered, max_workers
+    )
+    for chunk, results in chunks:
+        yield from zip(chunk, results)
+
+
+def parallel_filter_many(
+    matcher, objects, executor, chunksize=256, ordered=True, max_workers=None
+):
+    chunks = dispatch(
+        filter_chunk, matcher, objects, executor, chunksize, ordered, max_workers
+    )
+    for chunk, results in chunks:
+        yield from (obj for obj, matching in zip(chunk, results) if matching)
+
+
+def dispatch(function, matcher, objects, executor, chunksize, ordered, max_workers):
+    if isinstance(executor, str):
+        try:
+            executor_cls = executors[executor]
+        except KeyError:
+            raise ValueError(
+                f"Unknown executor {executor!r}, expected one of {list(executors)}"
+            )
+        if executor_cls is ThreadPoolExecutor:
+            with executor_cls(max_workers) as executor:
+                yield from submit_chunks(
+                    function,
+                    matcher,
+                    objects,
+                    executor,
+                    chunksize,
+                    ordered,
+                    max_workers,
+                )
+            return
+        # the pattern is sent once to each worker, which compiles it once
+        key = uuid4().hex
+        initargs = (key, dumps(matcher))
+        with executor_cls(
+            max_workers, initializer=install_pattern, initargs=initargs
+        ) as executor:
+            yield from submit_chunks(
+                function, key, objects, executor, chunksize, ordered, max_workers
+            )
+        return
+    if not isinstance(executor, ThreadPoolExecutor):
+        # pickled once, the workers compile it the first time they receive it
+        matcher = (uuid4().hex, dumps(matcher))
+    yield from submit_chunks(
+        function, matcher, objects, executor, chunksize, ordered, max_workers
+    )
+
+
+def submit_chunks(
+    function, pattern, objects, executor, chunksize, ordered, max_workers
+):
+    objects = iter(objects)
+    chunks = iter(lambda: list(islice(objects, chunksize)), [])
+    # only a bounded number of chunks are in flight, the input is not
+    # consumed faster than the workers process it
+    max_pending = 2 * (max_workers or cpu_count() or 1)
+    if ordered:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(function, pattern, chunk)))
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+        return
+    pending = {}
+    for chunk in chunks:
+        pending[executor.submit(function, pattern, chunk)] = chunk
+        if len(pending) >= max_pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
@@ -1,21 +1,23 @@
 from collections.abc import MutableSet
+from importlib import import_module
 from itertools import chain
 
 
 class match(object):
-    def __init__(self, cls):
+    def __init__(self, cls, subclassmatch=False):
         from .matchers import ObjectMatcher
 
-        self.matcher = ObjectMatcher(cls)
-        self.matcher.properties = {}
+        self.cls = cls
+        self.subclassmatch = subclassmatch
+        self.matcher = ObjectMatcher(cls, subclassmatch=subclassmatch)
 
     def __mod__(self, properties):
-        self.matcher.properties = properties
-        return self.matcher
+        from .matchers import ObjectMatcher
+
+        return ObjectMatcher(self.cls, properties, self.subclassmatch)
 
     def __getitem__(self, keys):
-        self.matcher.properties = keys if isinstance(keys, tuple) else [keys]
-        return self.matcher
+        return self % (keys if isinstance(keys, tuple) else [keys])
 
     def __matmul__(self, alias):
         from .matchers import SaveNodeMatcher
@@ -23,8 +25,7 @@ class match(object):
         return SaveNodeMatcher(alias, self.matcher)
 
     def __invert__(self):
-        self.matcher.subclassmatch = True
-        return self
+        return self.__class__(self.cls, subclassmatch=True)
 
     @property
     def and_subclasses(self):
@@ -83,3 +84,39 @@ def flat(iterable, iterable_cls=(list, set, tuple)):
                 result.append(first)
     except StopIteration:
         return result
+
+
+class FunctionRegistry(object):
+    def __init__(self):
+        self.functions = {}
+        self.names = {}
+
+    def register(self, fun=None, name=None):
+        if isinstance(fun, str):
+            fun, name = None, fun
+        if fun is None:
+            return lambda f: self.register(f, name=name)
+        name = name or f"{fun.__module__}.{fun.__qualname__}"
+        self.functions[name] = fun
+        self.names[id(fun)] = name
+        return fun
+
+    def name_of(self, fun):
+        name = self.names.get(id(fun))
+        if name is not None and self.functions.get(name) is fun:
+            return name
+        return None
+
+    def lookup(self, name, module=None):
+        try:
+            return self.functions[name]
+        except KeyError:
+            if module is None:
+                raise
+        # the function is registered when its module is imported
+        import_module(module)
+        return self.functions[name]
+
+
+functions = FunctionRegistry()
+register = functions.register
@@ -0,0 +1,161 @@
+from bisect import bisect_left, bisect_right
+from numbers import Real
+
+from .batch import match_many
+from .matchers import LiteralMatcher, ObjectMatcher, RangeMatcher, SaveNodeMatcher
+from .paths import ChildrenRecursivePath, DirectPath
+
+
+def bounds(values):
+    # the bounds of a range are read from its ends instead of iterating it
+    if isinstance(values, range):
+        first, last = values[0], values[-1]
+        return (first, last) if values.step > 0 else (last, first)
+    return min(values), max(values)
+
+
+class Index(object):
+    def __init__(self, root, hashed=(), ordered=()):
+        self.root = root
+        self.nodes = [root, *ChildrenRecursivePath().iter_from(root)]
+        self.positions = {id(node): i for i, node in enumerate(self.nodes)}
+        self.instances = {}
+        for node in self.nodes:
+            self.instances.setdefault(node.__class__, []).append(node)
+        self.hashed = {attr: self.build_hash_index(attr) for attr in hashed}
+        self.ordered = {attr: self.build_ordered_index(attr) for attr in ordered}
+
+    def build_hash_index(self, attr):
+        # per class: the nodes by value and the nodes holding unhashable
+        # values, the latter are candidates for any lookup
+        path = DirectPath(attr)
+        index = {}
+        for cls, nodes in self.instances.items():
+            buckets, unhashable = {}, []
+            for node in nodes:
+                for value in path.resolve_from(node):
+                    try:
+                        bucket = buckets.setdefault(value, [])
+                    except TypeError:
+                        bucket = unhashable
+                    if not bucket or bucket[-1] is not node:
+                        bucket.append(node)
+            if buckets or unhashable:
+                index[cls] = (buckets, unhashable)
+        return index
+
+    def build_ordered_index(self, attr):
+        # per class: the numeric values sorted with their nodes and the nodes
+        # holding other values, the latter are candidates for any range
+        path = DirectPath(attr)
+        index = {}
+        for cls, nodes in self.instances.items():
+            entries, unordered = [], []
+            for node in nodes:
+                for value in path.resolve_from(node):
+                    if isinstance(value, Real):
+                        entries.append((value, self.positions[id(node)], node))
+                    elif not unordered or unordered[-1] is not node:
+                        unordered.append(node)
+            if entries or unordered:
+                entries.sort(key=lambda entry: entry[:2])
+                keys = [value for value, _, _ in entries]
+                index[cls] = (keys, [node for _, _, node in entries], unordered)
+        return index
+
+    def classes(self, cls, subclasses=False):
+        if subclasses:
+            return [c for c in self.instances if issubclass(c, cls)]
+        return [cls] if cls in self.instances else []
+
+    def ordered_nodes(self, groups):
+        nodes, seen = [], set()
+        for group in groups:
+            for node in group:
+                if id(node) not in seen:
+                    seen.add(id(node))
+                    nodes.append(node)
+        if len(groups) > 1:
+            nodes.sort(key=lambda node: self.positions[id(node)])
+        return nodes
+
+    def instances_of(self, cls, subclasses=False):
+        return self.ordered_nodes(
+            [self.instances[c] for c in self.classes(cls, subclasses)]
+        )
+
+    def lookup(self, cls, attr, value, subclasses=False):
+        try:
+            index = self.hashed[attr]
+            hash(value)
+        except (KeyError, TypeError):
+            path = DirectPath(attr)
+            return [
+                node
+                for node in self.instances_of(cls, subclasses)
+                if any(v == value for v in path.resolve_from(node))
+            ]
+        groups = []
+        for c in self.classes(cls, subclasses):
+            buckets, unhashable = index.get(c, ({}, []))
+            groups.extend((buckets.get(value, []), unhashable))
+        return self.ordered_nodes(groups)
+
+    def range(self, cls, attr, values, subclasses=False):
+        try:
+            index = self.ordered[attr]
+        except KeyError:
+            path = DirectPath(attr)
+            return [
+                node
+                for node in self.instances_of(cls, subclasses)
+                if any(v in values for v in path.resolve_from(node))
+            ]
+        groups = []
+        for c in self.classes(cls, subclasses):
+            keys, nodes, unordered = index.get(c, ([], [], []))
+            if values:
+                # the keys between the bounds are still checked, e.g: for
+                # ranges with a step
+                low, high = bounds(values)
+                start = bisect_left(keys, low)
+                stop = bisect_right(keys, high)
+                groups.append(
+                    [
+                        node
+                        for key, node in zip(keys[start:stop], nodes[start:stop])
+                        if key in values
+                    ]
+                )
+            groups.append(unordered)
+        return self.ordered_nodes(groups)
+
+    def candidates(self, matcher):
+        while isinstance(matcher, SaveNodeMatcher):
+            matcher = matcher.matcher
+        if not isinstance(matcher, ObjectMatcher):
+            return self.nodes
+        cls, subclasses = matcher.cls, matcher.subclassmatch
+        best = None
+        for path, submatcher in matcher.properties:
+            if not isinstance(path, DirectPath):
+                continue
+            if isinstance(submatcher, LiteralMatcher) and path.path in self.hashed:
+                nodes = self.lookup(cls, path.path, submatcher.value, subclasses)
+            elif isinstance(submatcher, RangeMatcher) and path.path in self.ordered:
+                nodes = self.range(cls, path.path, submatcher.range, subclasses)
+            else:
+                continue
+            if best is None or len(nodes) < len(best):
+                best = nodes
+        if best is None:
+            return self.instances_of(cls, subclasses)
+        return best
+
+
+def findall(matcher, index):
+    return [
+        (node, result)
+        for node, result in match_many(matcher, index.candidates(matcher))
+        if result.is_match
+    ]
@@ -0,0 +1,100 @@
+from weakref import WeakSet
+
+from .matchers import as_matcher
+from .paths import accessed_attributes
+
+live_queries = WeakSet()
+
+
+class LiveQuery(object):
+    def __init__(self, matcher, subjects=(), callback=None):
+        self.matcher = as_matcher(matcher)
+        self.callback = callback
+        # subject id -> (subject, result, accessed attributes)
+        self.subjects = {}
+        # object id -> (object, attribute -> ids of the subjects reading it)
+        self.readers = {}
+        for subject in subjects:
+            self.add(subject)
+        live_queries.add(self)
+
+    @property
+    def results(self):
+        return [
+            (subject, result)
+            for subject, result, _ in self.subjects.values()
+            if result.is_match
+        ]
+
+    def add(self, subject):
+        if id(subject) not in self.subjects:
+            self.evaluate(subject)
+
+    def discard(self, subject):
+        entry = self.subjects.pop(id(subject), None)
+        if entry is not None:
+            self.forget(id(subject), entry[2])
+
+    def evaluate(self, subject):
+        accesses = {}
+        token = accessed_attributes.set(accesses)
+        try:
+            result = self.matcher.match(subject)
+        finally:
+            accessed_attributes.reset(token)
+        previous = self.subjects.get(id(subject))
+        if previous is not None:
+            self.forget(id(subject), previous[2])
+        self.subjects[id(subject)] = (subject, result, accesses)
+        for key, (obj, attributes) in accesses.items():
+            _, readers = self.readers.setdefault(key, (obj, {}))
+            for attribute in attributes:
+                readers.setdefault(attribute, set()).add(id(subject))
+        if self.callback is not None:
+            self.callback(subject, result)
+        return result
+
+    def forget(self, subject_id, accesses):
+        for key, (_, attributes) in accesses.items():
+            _, readers = self.readers[key]
+            for attribute in attributes:
+                subjects = readers[attribute]
+                subjects.discard(subject_id)
+                if not subjects:
+                    del readers[attribute]
+            if not readers:
+                del self.readers[key]
+
+    def notify(self, obj, attribute=None):
+        try:
+            _, readers = self.readers[id(obj)]
+        except KeyError:
+            return
+        if attribute is None:
+            impacted = set().union(*readers.values())
+        else:
+            impacted = readers.get(attribute, set()) | readers.get(None, set())
+        # only the subjects whose evaluation read the attribute are matched
+        # again, each one against the whole pattern
+        for subject_id in impacted:
+            entry = self.subjects.get(subject_id)
+            if entry is not None:
+                self.evaluate(entry[0])
+
+    def close(self):
+        live_queries.discard(self)
+
+
+def notify(obj, attribute=None):
+    for query in list(live_queries):
+        query.notify(obj, attribute)
+
+
+class Observable(object):
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        notify(self, name)
+
+    def __delattr__(self, name):
+        super().__delattr__(name)
+        notify(self, name)
@@ -1,15 +1,20 @@
+from asyncio import gather
+from collections import Counter, namedtuple
 from collections.abc import MutableMapping
 import itertools
+from pickle import PicklingError
 from re import compile
 from types import LambdaType
+from warnings import warn_explicit
 
-from .helpers import flat
-from .paths import as_path
+from .helpers import functions
+from .paths import PendingResolution, Resolver, as_path
 
 
 class MatcherResult(object):
-    def __init__(self):
+    def __init__(self, select=None):
         self.contexts = []
+        self.select = select
 
     @property
     def is_match(self):
@@ -18,24 +23,14 @@ class MatcherResult(object):
     def add_contexts(self, contexts):
         self.contexts.extend(c for c in contexts if c.is_match)
 
-    def analyse_contexts(self):
-        if any(len(c.delayed_matchers) > 0 for c in self.contexts):
-            print(
-                "WARNING: some matcher generators where not executed due to missing variables"
-            )
-            for c in self.contexts:
-                for bc in c.delayed_matchers:
-                    missing_vars = set(bc.matcher.vars) - set(c.bindings)
-                    code = bc.matcher.fun.__code__
-                    file = code.co_filename
-                    line = code.co_firstlineno
-                    print(
-                        f' * generator misses variables {missing_vars} to be executed ("{file}", L{line})'
-                    )
-
     @property
     def bindings(self):
-        return [c.bindings for c in self.contexts]
+        if self.select is None:
+            return [c.bindings for c in self.contexts]
+        return [
+            {k: v for k, v in c.bindings.items() if k in self.select}
+            for c in self.contexts
+        ]
 
     def __str__(self):
         return f"<{self.is_match} - {self.bindings}>"
@@ -44,28 +39,227 @@ class MatcherResult(object):
         return self.is_match
 
 
+class FactorizedResult(object):
+    # the results are the cartesian product of the factors: each factor is a
+    # list of contexts binding variables that the other factors do not bind
+    def __init__(self, factors):
+        self.factors = tuple(tuple(factor) for factor in factors)
+        self.factor_variables = tuple(
+            frozenset(k for c in factor for k in c.bindings) for factor in self.factors
+        )
+
+    @property
+    def is_match(self):
+        return all(self.factors)
+
+    def count(self):
+        count = 1
+        for factor in self.factors:
+            count *= len(factor)
+        return count
+
+    def __len__(self):
+        return self.count()
+
+    def __contains__(self, bindings):
+        keys = set(bindings)
+        for factor, variables in zip(self.factors, self.factor_variables):
+            expected = {k: bindings[k] for k in variables.intersection(bindings)}
+            if not any(c.bindings == expected for c in factor):
+                return False
+            keys -= variables
+        return not keys
+
+    def __iter__(self):
+        for contexts in itertools.product(*self.factors):
+            bindings = {}
+            for c in contexts:
+                bindings.update(c.bindings)
+            yield bindings
+
+    def expand(self):
+        result = MatcherResult()
+        for contexts in itertools.product(*self.factors):
+            context = Context()
+            for c in contexts:
+                for key, value in c.bindings.items():
+                    context[key] = value
+            result.contexts.append(context)
+        return result
+
+    def __str__(self):
+        count, size = self.count(), len(self.factors)
+        return f"<{self.is_match} - {count} results in {size} factors>"
+
+    def __bool__(self):
+        return self.is_match
+
+
+class ColumnarResult(object):
+    # one list per variable instead of one context per result, the variables
+    # that are not bound by a result are None in its row. An extensible result
+    # adds a column for each new variable it receives (e.g: variables bound by
+    # generated matchers).
+    def __init__(self, variables, extensible=False):
+        self.variables = tuple(variables)
+        self.columns = {variable: [] for variable in self.variables}
+        self.extensible = extensible
+        self.size = 0
+
+    @property
+    def is_match(self):
+        return self.size > 0
+
+    def append(self, bindings):
+        if self.extensible and not self.columns.keys() >= bindings.keys():
+            for variable in bindings:
+                if variable not in self.columns:
+                    self.columns[variable] = [None] * self.size
+            self.variables = tuple(self.columns)
+        for variable, column in self.columns.items():
+            column.append(bindings.get(variable))
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        if not self.columns:
+            return itertools.repeat((), self.size)
+        return zip(*self.columns.values())
+
+    def rows(self):
+        row = namedtuple("Row", self.variables, rename=True)
+        return itertools.starmap(row, iter(self))
+
+    @property
+    def bindings(self):
+        return [dict(zip(self.variables, values)) for values in self]
+
+    def to_numpy(self):
+        try:
+            import numpy
+        except ImportError as e:
+            raise ImportError("to_numpy() requires numpy to be installed") from e
+        arrays = [numpy.asarray(self.columns[v]) for v in self.variables]
+        dtype = [(v, array.dtype) for v, array in zip(self.variables, arrays)]
+        result = numpy.empty(self.size, dtype=dtype)
+        for variable, array in zip(self.variables, arrays):
+            result[variable] = array
+        return result
+
+    def __str__(self):
+        return f"<{self.is_match} - {self.size} rows of {list(self.variables)}>"
+
+    def __bool__(self):
+        return self.is_match
+
+
+class UnboundVariableWarning(UserWarning):
+    pass
+
+
+def distinct_contexts(contexts, select=None):
+    # bindings with hashable values are deduplicated with a set, the other
+    # ones are compared one by one
+    seen = set()
+    unhashable = []
+    for context in contexts:
+        bindings = context.bindings
+        if select is not None:
+            bindings = {k: v for k, v in bindings.items() if k in select}
+        key = tuple(sorted(bindings.items(), key=lambda item: item[0]))
+        try:
+            if key in seen:
+                continue
+            seen.add(key)
+        except TypeError:
+            if bindings in unhashable:
+                continue
+            unhashable.append(bindings)
+        yield context
+
+
+_UNBOUND = object()
+_DELETED = object()
+
+
 class Context(MutableMapping):
-    def __init__(self, truth=True):
-        self.bindings = {}
+    __slots__ = (
+        "_local",
+        "_frames",
+        "_depth",
+        "_is_match",
+        "truth",
+        "_waiting",
+        "discarded",
+        "distinct",
+        "memo",
+    )
+    max_depth = 8
+
+    def __init__(self, truth=True, discarded=frozenset(), distinct=False, memo=None):
+        # bindings are stored in a chain of frozen frames shared between
+        # copies, only the local frame belongs to this context
+        self._local = {}
+        self._frames = None
+        self._depth = 0
         self._is_match = truth
         self.truth = truth
-        self.delayed_matchers = []
+        # delayed generators indexed by the variable they wait for, the dict
+        # is shared between copies and replaced instead of being modified
+        self._waiting = {}
+        self.discarded = discarded
+        # only the distinct sets of (non discarded) bindings are needed, the
+        # branches differing only by discarded variables can be collapsed
+        self.distinct = distinct
+        # results of the nested patterns for the duration of one call, shared
+        # between copies
+        self.memo = memo
+
+    def _lookup(self, key):
+        value = self._local.get(key, _UNBOUND)
+        frames = self._frames
+        while value is _UNBOUND and frames is not None:
+            frame, frames = frames
+            value = frame.get(key, _UNBOUND)
+        return _UNBOUND if value is _DELETED else value
 
     def __getitem__(self, key):
-        return self.bindings[key]
+        value = self._lookup(key)
+        if value is _UNBOUND:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _UNBOUND
 
     def __setitem__(self, key, value):
-        self.bindings[key] = value
-        ctx = []
-        for gencontext in tuple(self.delayed_matchers):
-            if gencontext.can_execute(self):
-                ctx.extend(gencontext.execute(self))
-                self.delayed_matchers.remove(gencontext)
-        if any(not c.is_match for c in ctx):
-            self.is_match = property(lambda self: False)
+        if key in self.discarded:
+            return
+        self._local[key] = value
+        waiting = self._waiting
+        if key not in waiting:
+            return
+        waiting = dict(waiting)
+        ready = []
+        # only the generators waiting for this variable are woken up
+        for generator in waiting.pop(key):
+            missing = generator.missing_variable(self)
+            if missing is None:
+                ready.append(generator)
+            else:
+                waiting[missing] = waiting.get(missing, ()) + (generator,)
+        self._waiting = waiting
+        for gencontext in ready:
+            if any(not c.is_match for c in gencontext.execute(self)):
+                self.is_match = False
+                break
 
     def __delitem__(self, key):
-        del self.bindings[key]
+        if key not in self:
+            raise KeyError(key)
+        self._local[key] = _DELETED
 
     def __iter__(self):
         return iter(self.bindings)
@@ -73,6 +267,19 @@ class Context(MutableMapping):
     def __len__(self):
         return len(self.bindings)
 
+    @property
+    def bindings(self):
+        frames = []
+        current = self._frames
+        while current is not None:
+            frame, current = current
+            frames.append(frame)
+        bindings = {}
+        for frame in reversed(frames):
+            bindings.update(frame)
+        bindings.update(self._local)
+        return {k: v for k, v in bindings.items() if v is not _DELETED}
+
     @property
     def is_match(self):
         return self._is_match is self.truth
@@ -81,14 +288,84 @@ class Context(MutableMapping):
     def is_match(self, value):
         self._is_match = value
 
+    def __reduce__(self):
+        # pending generators are bound to the matching process, they are
+        # not part of the result and are not kept
+        return (_restore_context, (self.truth, self._is_match, self.bindings))
+
+    @property
+    def delayed_matchers(self):
+        return tuple(g for generators in self._waiting.values() for g in generators)
+
+    def delay(self, generator):
+        missing = generator.missing_variable(self)
+        waiting = dict(self._waiting)
+        waiting[missing] = waiting.get(missing, ()) + (generator,)
+        self._waiting = waiting
+
     def copy(self):
-        instance = self.__class__(self.truth)
-        instance.bindings.update(self.bindings)
-        instance.delayed_matchers.extend(self.delayed_matchers)
+        if self._local:
+            if self._depth >= self.max_depth:
+                self._frames = (self.bindings, None)
+                self._depth = 1
+            else:
+                self._frames = (self._local, self._frames)
+                self._depth += 1
+            self._local = {}
+        instance = self.__class__.__new__(self.__class__)
+        instance._local = {}
+        instance._frames = self._frames
+        instance._depth = self._depth
+        instance._is_match = self.truth
+        instance.truth = self.truth
+        instance._waiting = self._waiting
+        instance.discarded = self.discarded
+        instance.distinct = self.distinct
+        instance.memo = self.memo
+        return instance
+
+
+def _restore_context(truth, is_match, bindings):
+    context = Context(truth)
+    context._local.update(bindings)
+    context._is_match = is_match
+    return context
+
+
+class FrozenMatcherType(type):
+    def __call__(cls, *args, **kwargs):
+        instance = super().__call__(*args, **kwargs)
+        instance.__dict__["_frozen"] = True
         return instance
 
 
-class Matcher(object):
+class Matcher(object, metaclass=FrozenMatcherType):
+    # analyses cached on the instances, they are rebuilt on demand and are
+    # not part of the pickled state (they can hold closures)
+    derived_state = (
+        "_compiled",
+        "_plan",
+        "_components",
+        "_generated_properties",
+        "_memoizable",
+        "_property_variables",
+        "_unbound_variables",
+        "_unread_variables",
+    )
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k not in self.derived_state}
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"{self.__class__.__name__} instances are immutable")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"{self.__class__.__name__} instances are immutable")
+        super().__delattr__(name)
+
     def as_matcher(self):
         return self
 
@@ -100,13 +377,245 @@ class Matcher(object):
     def is_list_wildcard(self):
         return False
 
-    def match(self, obj):
-        result = MatcherResult()
-        contexts = self.match_context(obj, Context())
-        result.add_contexts(contexts)
-        result.analyse_contexts()
+    @property
+    def node_type(self):
+        return None
+
+    @property
+    def submatchers(self):
+        return ()
+
+    @property
+    def variables(self):
+        return ()
+
+    def walk(self):
+        yield self
+        for matcher in self.submatchers:
+            yield from matcher.walk()
+
+    @property
+    def unread_variables(self):
+        try:
+            return self.__dict__["_unread_variables"]
+        except KeyError:
+            pass
+        occurrences = Counter()
+        for matcher in self.walk():
+            if isinstance(matcher, MatcherGenerator):
+                # generated matchers can read any variable
+                occurrences.clear()
+                break
+            occurrences.update(matcher.variables)
+        # analyses are cached, they are not part of the frozen pattern
+        self.__dict__["_unread_variables"] = frozenset(
+            var for var, count in occurrences.items() if count == 1
+        )
+        return self.__dict__["_unread_variables"]
+
+    @property
+    def unbound_variables(self):
+        try:
+            return self.__dict__["_unbound_variables"]
+        except KeyError:
+            pass
+        bound = set()
+        consumers = []
+        generators = []
+        for matcher in self.walk():
+            if isinstance(matcher, LambdaBasedMatcher):
+                consumers.append(matcher)
+                if isinstance(matcher, MatcherGenerator):
+                    generators.append(matcher)
+            else:
+                bound.update(matcher.variables)
+        # the matchers produced by a generator can bind any variable, the
+        # other lambdas could be waiting for them
+        self.__dict__["_unbound_variables"] = tuple(
+            (matcher, frozenset(matcher.vars) - bound)
+            for matcher in consumers
+            if not bound.issuperset(matcher.vars)
+            and not any(g is not matcher for g in generators)
+        )
+        return self.__dict__["_unbound_variables"]
+
+    def check_variables(self):
+        # the lambdas using variables that no part of the pattern binds are
+        # never executed, they are reported once per pattern
+        if self.__dict__.get("_checked_variables"):
+            return
+        self.__dict__["_checked_variables"] = True
+        for matcher, missing in self.unbound_variables:
+            matcher.warn_missing(missing)
+
+    def match(self, obj, limit=None, offset=0, distinct=False, select=None):
+        self.check_variables()
+        if select is not None:
+            select = frozenset(select)
+        result = MatcherResult(select)
+        if limit is None and not offset and not distinct and select is None:
+            # all the results are computed, the nested patterns reached
+            # several times are matched once per object
+            memo = {}
+            try:
+                result.add_contexts(self.match_context(obj, Context(memo=memo)))
+            finally:
+                memo.clear()
+            return result
+        # the search stops as soon as the requested page is complete
+        contexts = self.iter_matches(obj, distinct, select)
+        stop = None if limit is None else offset + limit
+        result.contexts.extend(itertools.islice(contexts, offset, stop))
+        return result
+
+    def iter_matches(self, obj, distinct=False, select=None):
+        self.check_variables()
+        if select is None:
+            context = Context(distinct=distinct)
+        else:
+            # the variables that are neither selected nor read elsewhere are
+            # not bound, results are only distinct on the selected ones
+            select = frozenset(select)
+            discarded = self.unread_variables - select
+            context = Context(discarded=discarded, distinct=True)
+            distinct = True
+        contexts = (c for c in self.match_context(obj, context) if c.is_match)
+        if distinct:
+            return distinct_contexts(contexts, select)
+        return contexts
+
+    def factorize(self, obj):
+        self.check_variables()
+        memo = {}
+        try:
+            return FactorizedResult(self.match_factors(obj, Context(memo=memo)))
+        finally:
+            memo.clear()
+
+    def match_factors(self, obj, context):
+        return [[c for c in self.match_context(obj, context) if c.is_match]]
+
+    def match_columns(self, obj, distinct=False, select=None):
+        self.check_variables()
+        if select is None:
+            # the lambdas only read variables bound elsewhere, the variables of
+            # the generated matchers are only known once they are bound
+            variables, generated = {}, False
+            for matcher in self.walk():
+                if isinstance(matcher, MatcherGenerator):
+                    generated = True
+                elif not isinstance(matcher, LambdaBasedMatcher):
+                    variables.update(dict.fromkeys(matcher.variables))
+            result = ColumnarResult(variables, extensible=generated)
+        else:
+            result = ColumnarResult(select)
+        # only the bound values are kept, not the contexts
+        for context in self.iter_matches(obj, distinct, select):
+            result.append(context.bindings)
         return result
 
+    def count(self, obj):
+        self.check_variables()
+        # the contexts are counted as they are produced, the variables that
+        # are not read are not even bound
+        memo = {}
+        context = Context(discarded=self.unread_variables, memo=memo)
+        try:
+            return sum(1 for c in self.match_context(obj, context) if c.is_match)
+        finally:
+            memo.clear()
+
+    def distinct(self, obj, *variables):
+        contexts = self.iter_matches(obj, select=variables)
+        if len(variables) == 1:
+            return [c.get(variables[0]) for c in contexts]
+        return [tuple(c.get(v) for v in variables) for c in contexts]
+
+    def group_by(self, obj, *variables, agg=None, initial=0):
+        self.check_variables()
+        # without aggregation function the groups are counted, only the
+        # grouping variables are needed then
+        if agg is None:
+            discarded = self.unread_variables - set(variables)
+        else:
+            discarded = frozenset()
+        groups, memo = {}, {}
+        try:
+            for c in self.match_context(obj, Context(discarded=discarded, memo=memo)):
+                if not c.is_match:
+                    continue
+                if len(variables) == 1:
+                    key = c.get(variables[0])
+                else:
+                    key = tuple(c.get(v) for v in variables)
+                if agg is None:
+                    groups[key] = groups.get(key, 0) + 1
+                else:
+                    groups[key] = agg(groups.get(key, initial), c.bindings)
+        finally:
+            memo.clear()
+        return groups
+
+    def first(self, obj):
+        return next(self.iter_matches(obj), None)
+
+    def matches(self, obj):
+        self.check_variables()
+        context = Context(discarded=self.unread_variables, distinct=True)
+        for c in self.match_context(obj, context):
+            if c.is_match:
+                return True
+        return False
+
+    async def amatch(self, obj, concurrency=None):
+        resolver = Resolver(concurrency)
+        await self.prefetch(obj, resolver)
+        while True:
+            token = resolver.activate()
+            try:
+                return self.match(obj)
+            except PendingResolution as pending:
+                # not prefetched, e.g: reached through a generated matcher
+                missing = pending
+            finally:
+                resolver.deactivate(token)
+            await resolver.resolve(missing.obj, missing.key, missing.awaitable)
+
+    async def prefetch(self, obj, resolver):
+        await gather(*(m.prefetch(obj, resolver) for m in self.submatchers))
+
+    def match_many(
+        self, objects, executor=None, chunksize=256, ordered=True, max_workers=None
+    ):
+        from . import batch
+
+        if executor is None:
+            return batch.match_many(self, objects)
+        return batch.parallel_match_many(
+            self, objects, executor, chunksize, ordered, max_workers
+        )
+
+    def filter_many(
+        self, objects, executor=None, chunksize=256, ordered=True, max_workers=None
+    ):
+        from . import batch
+
+        if executor is None:
+            return batch.filter_many(self, objects)
+        return batch.parallel_filter_many(
+            self, objects, executor, chunksize, ordered, max_workers
+        )
+
+    def findall(self, index):
+        from .index import findall
+
+        return findall(self, index)
+
+    def live(self, subjects=(), callback=None):
+        from .live import LiveQuery
+
+        return LiveQuery(self, subjects, callback)
+
     def __or__(self, right):
         return OrMatcher(self, as_matcher(right))
 
@@ -120,7 +629,65 @@ class Matcher(object):
         return SaveNodeMatcher(alias, self)
 
     def __eq__(self, other):
-        return self.match(other)
+        return self.matches(other)
+
+    def compile(self):
+        try:
+            return self.__dict__["_compiled"]
+        except KeyError:
+            pass
+        self.__dict__["_compiled"] = CompiledMatcher(self)
+        return self.__dict__["_compiled"]
+
+    def compile_context(self):
+        return self.match_context
+
+    def compile_test(self):
+        return None
+
+    # estimated cost of the test produced by compile_test()
+    test_cost = 10
+
+    def describe(self):
+        return self.__class__.__name__
+
+    def explain(self):
+        return "\n".join(self.explain_lines())
+
+    def explain_lines(self):
+        lines = [self.describe()]
+        for matcher in self.submatchers:
+            lines.extend(f"  {line}" for line in matcher.explain_lines())
+        return lines
+
+
+class CompiledMatcher(Matcher):
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.match_context = matcher.compile_context()
+
+    @property
+    def is_collection_matcher(self):
+        return self.matcher.is_collection_matcher
+
+    @property
+    def submatchers(self):
+        return (self.matcher,)
+
+    def compile(self):
+        return self
+
+    def check_variables(self):
+        self.matcher.check_variables()
+
+    def match_factors(self, obj, context):
+        return self.matcher.match_factors(obj, context)
+
+    def __call__(self, obj):
+        return self.match(obj)
+
+    def __reduce__(self):
+        return (self.__class__, (self.matcher,))
 
 
 class extended(object):
@@ -129,7 +696,15 @@ class extended(object):
         self.result = None
 
     def __eq__(self, other):
-        self.result = other == self.o
+        if isinstance(other, Matcher):
+            # the boolean mode decides the case, the bindings are only
+            # computed for the matching one
+            if other.matches(self.o):
+                self.result = other.match(self.o)
+            else:
+                self.result = MatcherResult()
+        else:
+            self.result = other == self.o
         return self.result
 
     def __iter__(self):
@@ -149,28 +724,84 @@ class SaveNodeMatcher(Matcher):
     def is_list_wildcard(self):
         return self.matcher.is_list_wildcard
 
+    @property
+    def submatchers(self):
+        return (self.matcher,)
+
+    @property
+    def variables(self):
+        return (self.alias,)
+
+    @property
+    def node_type(self):
+        return self.matcher.node_type
+
+    def explain_lines(self):
+        lines = self.matcher.explain_lines()
+        return [f"{lines[0]} @ {self.alias}", *lines[1:]]
+
     def match_context(self, obj, context):
         context[self.alias] = obj
         return self.matcher.match_context(obj, context)
 
+    def match_factors(self, obj, context):
+        context[self.alias] = obj
+        if not context.is_match:
+            return [[]]
+        return self.matcher.match_factors(obj, context)
+
+    def compile_context(self):
+        alias = self.alias
+        match_context = self.matcher.compile_context()
+
+        def save_node(obj, context):
+            context[alias] = obj
+            return match_context(obj, context)
+
+        return save_node
+
 
 class IdentityMatcher(Matcher):
+    test_cost = 1
+
     def __init__(self, value):
         self.value = value
 
+    def describe(self):
+        return f"is {self.value!r}"
+
     def match_context(self, obj, context):
         context.is_match = obj is self.value
         return [context]
 
+    def compile_test(self):
+        value = self.value
+        return lambda obj: obj is value
+
+    def compile_context(self):
+        return _test_context(self.compile_test())
+
 
 class LiteralMatcher(Matcher):
+    test_cost = 1
+
     def __init__(self, value):
         self.value = value
 
+    def describe(self):
+        return f"== {self.value!r}"
+
     def match_context(self, obj, context):
         context.is_match = obj == self.value
         return [context]
 
+    def compile_test(self):
+        value = self.value
+        return lambda obj: obj == value
+
+    def compile_context(self):
+        return _test_context(self.compile_test())
+
 
 class LogicalMatcher(Matcher):
     ...
@@ -184,15 +815,59 @@ class NotMatcher(Matcher):
     def is_collection_matcher(self):
         return self.matcher.is_collection_matcher
 
+    @property
+    def submatchers(self):
+        return (self.matcher,)
+
     def match_context(self, obj, context):
         truth = not context.truth
-        contexts = self.matcher.match_context(obj, context)
-        if not contexts:
-            return [context]
-        contexts = [c for c in contexts if c.is_match is truth]
-        for c in contexts:
+        produced = False
+        for c in self.matcher.match_context(obj, context):
+            produced = True
+            if c.is_match is not truth:
+                # a positive sub-match, the remaining ones cannot be negative
+                break
             c.is_match = not truth
-        return contexts
+            yield c
+        if not produced:
+            yield context
+
+    @property
+    def test_cost(self):
+        return self.matcher.test_cost
+
+    def describe(self):
+        return f"not {self.matcher.describe()}"
+
+    def explain_lines(self):
+        lines = self.matcher.explain_lines()
+        return [f"not {lines[0]}", *lines[1:]]
+
+    def compile_test(self):
+        test = self.matcher.compile_test()
+        if test is None:
+            return None
+        return lambda obj: not test(obj)
+
+    def compile_context(self):
+        test = self.compile_test()
+        if test is not None:
+            return _test_context(test)
+        match_context = self.matcher.compile_context()
+
+        def not_context(obj, context):
+            truth = not context.truth
+            produced = False
+            for c in match_context(obj, context):
+                produced = True
+                if c.is_match is not truth:
+                    break
+                c.is_match = not truth
+                yield c
+            if not produced:
+                yield context
+
+        return not_context
 
 
 class OrMatcher(Matcher):
@@ -200,41 +875,492 @@ class OrMatcher(Matcher):
         self.left = left
         self.right = right
 
+    def describe(self):
+        return "or"
+
+    @property
+    def submatchers(self):
+        return (self.left, self.right)
+
     def match_context(self, obj, context):
-        left_contexts = self.left.match_context(obj, context.copy())
-        right_contexts = self.right.match_context(obj, context.copy())
-        return [c for c in left_contexts + right_contexts if c.is_match]
+        for c in self.left.match_context(obj, context.copy()):
+            if c.is_match:
+                yield c
+        for c in self.right.match_context(obj, context.copy()):
+            if c.is_match:
+                yield c
+
+    def compile_context(self):
+        left = self.left.compile_context()
+        right = self.right.compile_context()
+
+        def or_context(obj, context):
+            for c in left(obj, context.copy()):
+                if c.is_match:
+                    yield c
+            for c in right(obj, context.copy()):
+                if c.is_match:
+                    yield c
+
+        return or_context
 
 
 class KeyValueMatcher(object):
+    @property
+    def submatchers(self):
+        return tuple(matcher for _, matcher in self.properties)
+
+    @staticmethod
+    def build_property(key, value, dictkey=False):
+        matcher = as_matcher(value)
+        # the recursive paths only explore what can lead to the matched type
+        path = as_path(key, dictkey=dictkey)
+        if matcher.node_type is not None:
+            path = path.towards(matcher.node_type)
+        return path, matcher
+
+    async def prefetch(self, obj, resolver):
+        await gather(
+            *(
+                self.prefetch_property(obj, path, matcher, resolver)
+                for path, matcher in self.properties
+            )
+        )
+
+    @staticmethod
+    async def prefetch_property(obj, path, matcher, resolver):
+        try:
+            objects = await path.aresolve_from(obj, resolver)
+        except Exception:
+            # errors are raised again, if any, during the matching
+            return
+        if matcher.is_collection_matcher:
+            await matcher.prefetch(objects, resolver)
+        else:
+            await gather(*(matcher.prefetch(o, resolver) for o in objects))
+
+    @property
+    def plan(self):
+        try:
+            return self.__dict__["_plan"]
+        except KeyError:
+            pass
+        # the properties only testing the values they reach are checked
+        # first, cheapest first. Their count of matching values is then
+        # replayed at their place, the other properties are enumerated in
+        # declaration order so the results come in the same order.
+        filters = []
+        for index, (path, matcher) in enumerate(self.properties):
+            if matcher.is_collection_matcher:
+                continue
+            test = matcher.compile_test()
+            if test is not None:
+                filters.append(((path.cost, matcher.test_cost, index), test))
+        filters.sort(key=lambda f: f[0])
+        self.__dict__["_plan"] = tuple((key[2], test) for key, test in filters)
+        return self.__dict__["_plan"]
+
+    @property
+    def property_variables(self):
+        try:
+            return self.__dict__["_property_variables"]
+        except KeyError:
+            pass
+        variables = tuple(
+            frozenset(v for m in matcher.walk() for v in m.variables)
+            for _, matcher in self.properties
+        )
+        self.__dict__["_property_variables"] = variables
+        return variables
+
+    @property
+    def generated_properties(self):
+        try:
+            return self.__dict__["_generated_properties"]
+        except KeyError:
+            pass
+        # generated matchers can bind any variable, their variables are only
+        # known at runtime
+        generated = tuple(
+            any(isinstance(m, MatcherGenerator) for m in matcher.walk())
+            for _, matcher in self.properties
+        )
+        self.__dict__["_generated_properties"] = generated
+        return generated
+
+    @property
+    def memoizable(self):
+        try:
+            return self.__dict__["_memoizable"]
+        except KeyError:
+            pass
+        # only the nested patterns are worth remembering, not the leaves. The
+        # generated matchers can read any variable, their results cannot be
+        # keyed by the variables of the pattern.
+        memoizable = tuple(
+            not matcher.is_collection_matcher
+            and not generated
+            and any(isinstance(m, KeyValueMatcher) for m in matcher.walk())
+            for (_, matcher), generated in zip(
+                self.properties, self.generated_properties
+            )
+        )
+        self.__dict__["_memoizable"] = memoizable
+        return memoizable
+
+    @property
+    def components(self):
+        try:
+            return self.__dict__["_components"]
+        except KeyError:
+            pass
+        # the properties are grouped when they share variables, directly or
+        # through other properties. The variables of generated matchers are
+        # unknown, they could be shared with any property.
+        if any(self.generated_properties):
+            components = (tuple(range(len(self.properties))),)
+            self.__dict__["_components"] = components
+            return components
+        groups = []
+        for index, variables in enumerate(self.property_variables):
+            indices, merged = [index], set(variables)
+            for group in [g for g in groups if not g[1].isdisjoint(variables)]:
+                groups.remove(group)
+                indices.extend(group[0])
+                merged.update(group[1])
+            groups.append((sorted(indices), merged))
+        components = tuple(tuple(indices) for indices, _ in groups)
+        self.__dict__["_components"] = tuple(sorted(components))
+        return self.__dict__["_components"]
+
+    def explain_lines(self):
+        lines = [self.describe()]
+        filtered = set()
+        for index, _ in self.plan:
+            path, matcher = self.properties[index]
+            filtered.add(index)
+            lines.append(f"  check {path}: {matcher.describe()}")
+        for index, (path, matcher) in enumerate(self.properties):
+            if index in filtered:
+                continue
+            sublines = matcher.explain_lines()
+            lines.append(f"  match {path}: {sublines[0]}")
+            lines.extend(f"  {line}" for line in sublines[1:])
+        return lines
+
+    def check_filters(self, obj):
+        counts = {}
+        for index, test in self.plan:
+            path = self.properties[index][0]
+            count = 0
+            for o in path.iter_from(obj):
+                if test(o):
+                    count += 1
+            if count == 0:
+                return None
+            counts[index] = count
+        return counts
+
     def match_context(self, obj, context):
         context.is_match = True
-        new_contexts = [context]
-        for path, matcher in self.properties:
-            results = []
-            for context in new_contexts:
-                if matcher.is_collection_matcher:
-                    cpy = context.copy()
-                    results.extend(matcher.match_context(path.resolve_from(obj), cpy))
+        counts = self.check_filters(obj)
+        if counts is None:
+            return iter(())
+        return self.match_properties(obj, context, range(len(self.properties)), counts)
+
+    def match_factors(self, obj, context):
+        context.is_match = True
+        counts = self.check_filters(obj)
+        if counts is None:
+            return [[]]
+        # the groups of properties that do not share variables are matched
+        # separately, their combinations are never enumerated
+        factors = []
+        for indices in self.components:
+            contexts = self.match_properties(obj, context.copy(), indices, counts)
+            factor = [c for c in contexts if c.is_match]
+            if not factor:
+                return [[]]
+            factors.append(factor)
+        return factors or [[context]]
+
+    def match_properties(self, obj, context, indices, counts):
+        size = len(indices)
+        if size == 0:
+            yield context
+            return
+        # explicit stack of property iterators, each combination is yielded
+        # directly instead of going through one generator per property
+        stack = [self.match_property(obj, context, indices[0], counts)]
+        while stack:
+            c = next(stack[-1], None)
+            if c is None:
+                stack.pop()
+            elif c.is_match:
+                if len(stack) >= size:
+                    yield c
                 else:
-                    results.extend(
-                        flat(
-                            [
-                                matcher.match_context(o, context.copy())
-                                for o in path.resolve_from(obj)
-                            ]
-                        )
+                    stack.append(
+                        self.match_property(obj, c, indices[len(stack)], counts)
+                    )
+
+    def match_property(self, obj, context, index, counts):
+        if index in counts:
+            return _replay(context, 1 if context.distinct else counts[index])
+        path, matcher = self.properties[index]
+        if matcher.is_collection_matcher:
+            contexts = matcher.match_context(path.resolve_from(obj), context.copy())
+        elif context.memo is not None and self.memoizable[index]:
+            variables = self.property_variables[index]
+            match_context = matcher.match_context
+            contexts = (
+                c
+                for o in path.iter_from(obj)
+                for c in _memoized(match_context, matcher, o, context, variables)
+            )
+        else:
+            contexts = (
+                c
+                for o in path.iter_from(obj)
+                for c in matcher.match_context(o, context.copy())
+            )
+        if _collapsible(
+            context, self.property_variables[index], self.generated_properties[index]
+        ):
+            return _first_match(contexts, context._waiting)
+        return contexts
+
+    def compile_properties(self):
+        filters = [
+            (index, self.properties[index][0].compile_iter(), test)
+            for index, test in self.plan
+        ]
+        properties = []
+        for index, (path, matcher) in enumerate(self.properties):
+            if any(index == i for i, _, _ in filters):
+                properties.append(None)
+            elif matcher.is_collection_matcher:
+                properties.append(
+                    _collection_property(
+                        path.compile_resolve(), matcher.compile_context()
                     )
-            new_contexts = [c for c in results if c.is_match]
-        return new_contexts
+                )
+            elif self.memoizable[index]:
+                properties.append(
+                    _memoized_property(
+                        path.compile_iter(),
+                        matcher.compile_context(),
+                        matcher,
+                        self.property_variables[index],
+                    )
+                )
+            else:
+                properties.append(
+                    _property(path.compile_iter(), matcher.compile_context())
+                )
+        if not properties:
+            return lambda obj, context: (context,)
+        size = len(properties)
+        property_variables = self.property_variables
+        generated_properties = self.generated_properties
+
+        def match_properties(obj, context):
+            counts = {}
+            for index, resolve_from, test in filters:
+                count = 0
+                for o in resolve_from(obj):
+                    if test(o):
+                        count += 1
+                if count == 0:
+                    return
+                counts[index] = count
+
+            def step(index, c):
+                match_property = properties[index]
+                if match_property is None:
+                    return _replay(c, 1 if c.distinct else counts[index])
+                variables = property_variables[index]
+                if _collapsible(c, variables, generated_properties[index]):
+                    return _first_match(match_property(obj, c), c._waiting)
+                return match_property(obj, c)
+
+            stack = [step(0, context)]
+            while stack:
+                c = next(stack[-1], None)
+                if c is None:
+                    stack.pop()
+                elif c.is_match:
+                    if len(stack) >= size:
+                        yield c
+                    else:
+                        stack.append(step(len(stack), c))
+
+        return match_properties
+
+
+def _collapsible(context, variables, generated):
+    # when a property binds nothing that is kept, all its matching contexts
+    # lead to the same results: the first one is enough
+    return (
+        context.distinct and not generated and context.discarded.issuperset(variables)
+    )
+
+
+def _first_match(contexts, waiting):
+    # a match still waiting for new variables can fail later, the search
+    # only stops on a match that is already settled
+    for c in contexts:
+        yield c
+        if c.is_match and c._waiting is waiting:
+            return
+
+
+def _memoized(match_context, matcher, obj, context, variables):
+    memo = context.memo
+    # most objects are reached once: until a pattern reaches an object a
+    # second time, the objects are only marked. Then the pattern records its
+    # results on the first visit of each object. Objects and values are kept
+    # in the table so their ids cannot be reused during the call.
+    reached = (id(matcher), id(obj))
+    if id(matcher) not in memo:
+        if reached not in memo:
+            memo[reached] = obj
+            return match_context(obj, context.copy())
+        memo[id(matcher)] = matcher
+    # the results only depend on the object and on the variables of the
+    # pattern that are already bound
+    bound = tuple((v, context[v]) for v in variables if v in context)
+    key = (reached, tuple((v, id(value)) for v, value in bound))
+    entry = memo.get(key)
+    if entry is not None:
+        deltas = entry[2]
+    elif context._waiting:
+        # the delayed generators could be woken up by the nested pattern, its
+        # results are recorded without them
+        deltas = _record_deltas(match_context, obj, context, bound)
+        memo[key] = (obj, bound, deltas)
+    else:
+        return _recording(match_context, obj, context, variables, bound, key)
+    if deltas is None:
+        return match_context(obj, context.copy())
+    return _replay_deltas(context, deltas)
+
+
+def _recording(match_context, obj, context, variables, bound, key):
+    # the results are produced as they are recorded, the deltas are only
+    # remembered if all of them are produced
+    seeded = dict(bound)
+    deltas = []
+    for c in match_context(obj, context.copy()):
+        if deltas is not None and c.is_match:
+            if c._waiting:
+                # waits for variables bound elsewhere, cannot be replayed
+                deltas = None
+            else:
+                deltas.append(
+                    {
+                        v: value
+                        for v, value in ((v, c._lookup(v)) for v in variables)
+                        if value is not _UNBOUND
+                        and seeded.get(v, _UNBOUND) is not value
+                    }
+                )
+        yield c
+    context.memo[key] = (obj, bound, deltas)
+
+
+def _record_deltas(match_context, obj, context, bound):
+    fresh = Context(context.truth, context.discarded, context.distinct, context.memo)
+    for variable, value in bound:
+        fresh[variable] = value
+    seeded = dict(bound)
+    deltas = []
+    for c in match_context(obj, fresh):
+        if not c.is_match:
+            continue
+        if c.delayed_matchers:
+            # waits for variables bound elsewhere, cannot be replayed
+            return None
+        # the bound variables can be bound again (e.g: "@ alias"), they are
+        # part of the delta when their value changed
+        deltas.append(
+            {
+                k: v
+                for k, v in c.bindings.items()
+                if k not in seeded or seeded[k] is not v
+            }
+        )
+    return deltas
+
+
+def _replay_deltas(context, deltas):
+    # the new bindings are set again, they still trigger the delayed
+    # generators and are compared with the existing bindings
+    for delta in deltas:
+        c = context.copy()
+        for key, value in delta.items():
+            c[key] = value
+        yield c
+
+
+def _memoized_property(resolve_from, match_context, matcher, variables):
+    def match_property(obj, context):
+        if context.memo is None:
+            return (
+                c for o in resolve_from(obj) for c in match_context(o, context.copy())
+            )
+        return (
+            c
+            for o in resolve_from(obj)
+            for c in _memoized(match_context, matcher, o, context, variables)
+        )
+
+    return match_property
+
+
+def _replay(context, count):
+    if count == 1:
+        # a test does not touch the context, no need to copy it
+        return iter((context,))
+    return iter([context.copy() for _ in range(count)])
+
+
+def _test_context(test):
+    def match_context(obj, context):
+        context.is_match = test(obj)
+        return (context,)
+
+    return match_context
+
+
+def _collection_property(resolve_from, match_context):
+    def match_property(obj, context):
+        return iter(match_context(resolve_from(obj), context.copy()))
+
+    return match_property
+
+
+def _property(resolve_from, match_context):
+    def match_property(obj, context):
+        return (c for o in resolve_from(obj) for c in match_context(o, context.copy()))
+
+    return match_property
 
 
 class ObjectMatcher(KeyValueMatcher, Matcher):
     def __init__(self, cls, properties=None, subclassmatch=False):
-        self.properties = properties
+        self.properties = self.build_properties(properties)
         self.cls = cls
         self.subclassmatch = subclassmatch
 
+    @property
+    def node_type(self):
+        return self.cls
+
+    def describe(self):
+        prefix = "~" if self.subclassmatch else ""
+        return f"{prefix}match({self.cls.__name__})"
+
     def match_context(self, obj, context):
         sametype = (
             isinstance(obj, self.cls)
@@ -246,52 +1372,131 @@ class ObjectMatcher(KeyValueMatcher, Matcher):
             return [context]
         return super().match_context(obj, context)
 
-    @property
-    def properties(self):
-        return self._properties
+    def match_factors(self, obj, context):
+        if self.subclassmatch:
+            sametype = isinstance(obj, self.cls)
+        else:
+            sametype = obj.__class__ == self.cls
+        if not sametype:
+            return [[]]
+        return super().match_factors(obj, context)
+
+    async def prefetch(self, obj, resolver):
+        if self.subclassmatch:
+            sametype = isinstance(obj, self.cls)
+        else:
+            sametype = obj.__class__ == self.cls
+        if sametype:
+            await super().prefetch(obj, resolver)
+
+    def compile_context(self):
+        cls = self.cls
+        match_properties = self.compile_properties()
+
+        if self.subclassmatch:
+
+            def object_context(obj, context):
+                if not isinstance(obj, cls):
+                    context.is_match = False
+                    return (context,)
+                context.is_match = True
+                return match_properties(obj, context)
+
+        else:
+
+            def object_context(obj, context):
+                if obj.__class__ != cls:
+                    context.is_match = False
+                    return (context,)
+                context.is_match = True
+                return match_properties(obj, context)
+
+        return object_context
 
-    @properties.setter
-    def properties(self, properties):
+    @staticmethod
+    def build_properties(properties):
         if properties is None:
-            self._properties = {}
-            return
+            return ()
         elif isinstance(properties, dict):
-            props = [(as_path(k), as_matcher(v)) for k, v in properties.items()]
+            items = properties.items()
         else:
-            props = [(as_path(sl.start), as_matcher(sl.stop)) for sl in properties]
-        self._properties = props
+            items = ((sl.start, sl.stop) for sl in properties)
+        return tuple(KeyValueMatcher.build_property(k, v) for k, v in items)
 
 
 class DictMatcher(KeyValueMatcher, Matcher):
     def __init__(self, d):
-        self.properties = [
-            (as_path(k, dictkey=True), as_matcher(v)) for k, v in d.items()
-        ]
+        self.properties = tuple(
+            self.build_property(k, v, dictkey=True) for k, v in d.items()
+        )
+
+    def describe(self):
+        return "dict"
+
+    def compile_context(self):
+        match_properties = self.compile_properties()
+
+        def dict_context(obj, context):
+            context.is_match = True
+            return match_properties(obj, context)
+
+        return dict_context
 
 
 class LambdaBasedMatcher(Matcher):
     __self__ = "__self__"
 
     def __init__(self, fun):
+        if isinstance(fun, str):
+            fun = functions.lookup(fun)
         self.fun = fun
-        self.vars = [*fun.__code__.co_varnames[: fun.__code__.co_argcount]]
-        if self.__self__ in self.vars:
-            self.has_self = True
-            self.vars.remove(self.__self__)
-        else:
-            self.has_self = False
+        args = fun.__code__.co_varnames[: fun.__code__.co_argcount]
+        self.has_self = self.__self__ in args
+        self.vars = tuple(arg for arg in args if arg != self.__self__)
+
+    @property
+    def variables(self):
+        return self.vars
+
+    def describe(self):
+        return f"{self.__class__.__name__}({self.fun.__name__})"
+
+    def warn_missing(self, missing_vars):
+        code = self.fun.__code__
+        warn_explicit(
+            f"{self.describe()} misses variables {sorted(missing_vars)} to be"
+            " executed, they are never bound by the pattern",
+            UnboundVariableWarning,
+            code.co_filename,
+            code.co_firstlineno,
+            module=self.fun.__module__,
+        )
+
+    def __reduce__(self):
+        name = functions.name_of(self.fun)
+        if name is not None:
+            return (_registered, (self.__class__, name, self.fun.__module__))
+        if self.fun.__name__ == "<lambda>" or "<locals>" in self.fun.__qualname__:
+            raise PicklingError(
+                f"{self.fun.__qualname__} cannot be pickled, register it with iguala.register"
+            )
+        return (self.__class__, (self.fun,))
 
     def match_context(self, obj, context):
         try:
             kwargs = {k: context[k] for k in self.vars}
         except KeyError:
-            context.delayed_matchers.append(BoundMatcherGenerator(self, context, obj))
+            context.delay(BoundMatcherGenerator(self, context, obj))
             return [context]
         if self.has_self:
             kwargs[self.__self__] = obj
         return self.execute(obj, context, kwargs)
 
 
+def _registered(cls, name, module):
+    return cls(functions.lookup(name, module))
+
+
 class MatcherGenerator(LambdaBasedMatcher):
     def execute(self, obj, context, kwargs):
         return as_matcher(self.fun(**kwargs)).match_context(obj, context)
@@ -309,21 +1514,32 @@ class BoundMatcherGenerator(object):
         self.context = context
         self.self_object = self_object
 
-    def can_execute(self, context):
-        return all(x in context for x in self.matcher.vars)
+    def missing_variable(self, context):
+        for var in self.matcher.vars:
+            if var not in context:
+                return var
+        return None
 
     def execute(self, context):
         return self.matcher.match_context(self.self_object, context.copy())
 
 
 class RegexMatcher(Matcher):
+    test_cost = 5
+
     def __init__(self, regexp, label=None):
         self.regexp = compile(regexp)
         self.label = label
 
+    def describe(self):
+        return f"regex {self.regexp.pattern!r}"
+
     def __rshift__(self, label):
-        self.label = label
-        return self
+        return self.__class__(self.regexp, label)
+
+    @property
+    def variables(self):
+        return (self.label,) if self.label else ()
 
     def match_context(self, obj, context):
         if obj is None:
@@ -335,24 +1551,57 @@ class RegexMatcher(Matcher):
             context[self.label] = result
         return [context]
 
+    def compile_test(self):
+        if self.label:
+            return None
+        regexp_match = self.regexp.match
+        return lambda obj: obj is not None and regexp_match(obj) is not None
+
+    def compile_context(self):
+        test = self.compile_test()
+        if test is None:
+            return self.match_context
+        return _test_context(test)
+
 
 class RangeMatcher(Matcher):
+    test_cost = 2
+
     def __init__(self, range):
         self.range = range
 
+    def describe(self):
+        return f"in {self.range!r}"
+
     def match_context(self, obj, context):
         context.is_match = obj in self.range
         return [context]
 
+    def compile_test(self):
+        values = self.range
+        return lambda obj: obj in values
+
+    def compile_context(self):
+        return _test_context(self.compile_test())
+
 
 class WildcardMatcher(Matcher):
+    test_cost = 0
+
     def __init__(self, alias):
         self.alias = alias
 
+    def describe(self):
+        return f"@{self.alias}"
+
     @property
     def is_anonymous(self):
         return self.alias == "_"
 
+    @property
+    def variables(self):
+        return () if self.is_anonymous else (self.alias,)
+
     def match_context(self, obj, context):
         if self.is_anonymous:
             context.is_match = True
@@ -364,208 +1613,254 @@ class WildcardMatcher(Matcher):
         context[self.alias] = obj
         return [context]
 
+    def compile_test(self):
+        if self.is_anonymous:
+            return lambda obj: True
+        return None
+
+    def compile_context(self):
+        if self.is_anonymous:
+            return _test_context(self.compile_test())
+        alias = self.alias
+
+        def wildcard_context(obj, context):
+            if alias in context:
+                context.is_match = context[alias] == obj
+            else:
+                context.is_match = True
+                context[alias] = obj
+            return (context,)
+
+        return wildcard_context
+
 
 class ListWildcardMatcher(WildcardMatcher):
     @property
     def is_list_wildcard(self):
         return True
 
+    def describe(self):
+        return f"*{self.alias}" if self.alias else "..."
+
     @property
     def is_anonymous(self):
         return not self.alias or super().is_anonymous
 
 
 class SequenceMatcher(Matcher):
+    def describe(self):
+        return "sequence"
+
     def __init__(self, sequence):
-        self.sequence = [as_matcher(m) for m in sequence]
+        self.sequence = tuple(as_matcher(m) for m in sequence)
+        # number of elements required by the pattern from each position
+        min_lengths = [0]
+        for matcher in reversed(self.sequence):
+            min_lengths.append(min_lengths[-1] + (not matcher.is_list_wildcard))
+        self.min_lengths = tuple(reversed(min_lengths))
+        wildcards = [i for i, m in enumerate(self.sequence) if m.is_list_wildcard]
+        self.max_length = None if wildcards else len(self.sequence)
+        self.last_wildcard = wildcards[-1] if wildcards else None
+        self.anonymous = tuple(
+            type(m) is ListWildcardMatcher and m.is_anonymous for m in self.sequence
+        )
+        self.anchors = tuple(self.anchor_after(i) for i in range(len(self.sequence)))
+        self.state_variables = tuple(
+            self.variables_from(i) for i in range(len(self.sequence))
+        )
+
+    def anchor_after(self, index):
+        # literals right after a list wildcard, the wildcard can only end
+        # where they occur in the subject
+        if not self.sequence[index].is_list_wildcard:
+            return None
+        values = []
+        for matcher in self.sequence[index + 1 :]:
+            if type(matcher) is not LiteralMatcher:
+                break
+            values.append(matcher.value)
+        return Anchor(values) if values else None
+
+    def variables_from(self, index):
+        variables = set()
+        for matcher in self.sequence[index:]:
+            for m in matcher.walk():
+                if isinstance(m, MatcherGenerator):
+                    # generated matchers can read any variable
+                    return None
+                variables.update(m.variables)
+        return frozenset(variables)
 
     @property
     def is_collection_matcher(self):
         return True
 
+    @property
+    def submatchers(self):
+        return self.sequence
+
+    async def prefetch(self, obj, resolver):
+        if not isinstance(obj, (list, tuple)):
+            return
+        await gather(
+            *(
+                m.prefetch(o, resolver)
+                for m in self.sequence
+                if not m.is_list_wildcard
+                for o in obj
+            )
+        )
+
     def match_context(self, obj, context):
-        results = []
         try:
-            cursor = Cursor(self.sequence, obj, context)
+            size = len(obj)
         except Exception:
-            return results
-        while cursor.has_next:
-            found_combination = False
-            while not found_combination and cursor.has_next:
-                found_combination = self.match_next(obj, cursor, context)
-            if found_combination:
-                results.extend(cursor.contexts_for_current_pattern())
-                cursor.forward = False
-        return results
-
-    def match_next(self, collection, cursor, context):
-        contexts = [c.copy() for c in cursor.contexts_for_current_pattern()]
-        if cursor.forward:
-            if cursor.pattern_cursor >= cursor.pattern_size:
-                if cursor.subject_cursor >= cursor.subject_size:
-                    return True
-                cursor.set_backward()
-                cursor.decrement_pattern_cursor()
-                cursor.clear_contexts_for_current_pattern()
-        else:
-            if cursor.pattern_cursor >= cursor.pattern_size:
-                cursor.decrement_pattern_cursor()
-                cursor.decrement_subject_cursor()
-        if cursor.pattern_cursor < 0 or cursor.subject_cursor < 0:
-            cursor.has_next = False
-            return False
-        pattern = self.sequence[cursor.pattern_cursor]
-        if not pattern.is_list_wildcard:
-            if cursor.forward and cursor.subject_cursor < cursor.subject_size:
-                cursor.reset_has_next_current_pattern()
-                cursor.clear_contexts_for_current_pattern()
-                new_contexts = flat(
-                    [
-                        pattern.match_context(collection[cursor.subject_cursor], c)
-                        for c in contexts
-                    ]
-                )
-                if any(c.is_match for c in new_contexts):
-                    cursor.set_has_next_current_pattern()
-                    contexts = [c for c in new_contexts if c.is_match]
-                    cursor.add_contexts_to_pattern(contexts)
-                    cursor.increment_pattern_cursor()
-                    cursor.increment_subject_cursor()
-                else:
-                    cursor.decrement_pattern_cursor()
-                    cursor.set_backward()
-            else:
-                if cursor.subject_cursor < cursor.subject_size:
-                    new_contexts = flat(
-                        [
-                            pattern.match_context(collection[cursor.subject_cursor], c)
-                            for c in contexts
-                        ]
-                    )
-                    if cursor.has_next_current_pattern() and any(
-                        c.is_match for c in new_contexts
-                    ):
-                        contexts = [c for c in new_contexts if c.is_match]
-                        cursor.reset_has_next_current_pattern()
-                        cursor.add_contexts_to_pattern(contexts)
-                        cursor.increment_pattern_cursor()
-                        cursor.increment_subject_cursor()
-                        cursor.set_forward()
-                    else:
-                        cursor.decrement_pattern_cursor()
-                        cursor.decrement_subject_cursor()
-                        cursor.set_backward()
-                else:
-                    cursor.decrement_pattern_cursor()
-                    cursor.decrement_subject_cursor()
-                    cursor.set_backward()
+            return
+        if size < self.min_lengths[0]:
+            return
+        if self.max_length is not None and size > self.max_length:
+            return
+        yield from self.match_from(obj, size, 0, 0, [context], {})
+
+    def match_from(self, collection, size, index, start, contexts, dead):
+        # contexts are the ones matching the pattern up to "index" with the
+        # subject up to "start", states without any completion are
+        # remembered in "dead" and never explored twice
+        sequence = self.sequence
+        end = len(sequence)
+        while index < end and not sequence[index].is_list_wildcard:
+            if start >= size:
+                return
+            matcher = sequence[index]
+            element = collection[start]
+            contexts = [
+                nc
+                for c in contexts
+                for nc in matcher.match_context(element, c.copy())
+                if nc.is_match
+            ]
+            if not contexts:
+                return
+            index += 1
+            start += 1
+        if index == end:
+            if start == size:
+                yield from contexts
+            return
+        keys = [self.state_key(index, start, c) for c in contexts]
+        contexts = [
+            c
+            for c, key in zip(contexts, keys)
+            if key is None or start < dead.get(key, size + 1)
+        ]
+        if not contexts:
+            return
+        matcher = sequence[index]
+        anonymous = self.anonymous[index]
+        last = size - self.min_lengths[index + 1]
+        anchor = self.anchors[index]
+        if index == self.last_wildcard:
+            # the end of the pattern has a fixed size
+            lengths = (last - start,)
+        elif anchor is not None:
+            lengths = (p - start for p in anchor.positions(collection, start, last))
         else:
-            if cursor.forward:
-                cursor.lv_starts[cursor.pattern_cursor] = cursor.subject_cursor
-                if cursor.pattern_cursor == (cursor.pattern_size - 1):
-                    cursor.lv_lengths[cursor.pattern_cursor] = max(
-                        cursor.subject_size - cursor.subject_cursor, 0
-                    )
-                else:
-                    cursor.lv_lengths[cursor.pattern_cursor] = cursor.lv_min_lenghts[
-                        cursor.pattern_cursor
-                    ]
-            else:
-                cursor.lv_lengths[cursor.pattern_cursor] += 1
-                cursor.set_forward()
-                cursor.clear_contexts_for_current_pattern()
-            length = cursor.lv_lengths[cursor.pattern_cursor]
-            start = cursor.lv_starts[cursor.pattern_cursor]
-            min = cursor.lv_min_lenghts[cursor.pattern_cursor]
-            _max = cursor.lv_max_lenghts[cursor.pattern_cursor]
-
-            if length > _max or (start + length) >= (cursor.subject_size + 1):
-                cursor.subject_cursor = start
-                cursor.set_backward()
-                cursor.lv_lengths[cursor.pattern_cursor] = 0
-                cursor.decrement_pattern_cursor()
-                cursor.clear_contexts_for_current_pattern()
+            lengths = range(last - start + 1)
+        found = False
+        for length in lengths:
+            if anonymous:
+                matched = [c.copy() for c in contexts]
             else:
                 subjects = collection[start : start + length]
-                contexts = flat([pattern.match_context(subjects, c) for c in contexts])
-                if any(c.is_match for c in contexts):
-                    contexts = [c for c in contexts if c.is_match]
-                    cursor.add_contexts_to_pattern(contexts)
-                    cursor.increment_pattern_cursor()
-                    cursor.subject_cursor = start + length
-                else:
-                    cursor.set_backward()
-                    cursor.lv_lengths[cursor.pattern_cursor] = 0
-                    cursor.decrement_pattern_cursor()
-        return False
-
-
-class Cursor(object):
-    def __init__(self, matcher_sequence, sequence, original_context):
-        self.subject_size = len(sequence)
-        self.pattern_size = len(matcher_sequence)
-        self.lv_starts = [None] * self.pattern_size
-        self.lv_lengths = [None] * self.pattern_size
-        self.lv_min_lenghts = [None] * self.pattern_size
-        self.lv_max_lenghts = [None] * self.pattern_size
-        self.subject_cursor = 0
-        self.pattern_cursor = 0
-        self.wildcard_pos = [
-            i for i, m in enumerate(matcher_sequence) if m.is_list_wildcard
-        ]
-        self.num_nonlistwildcard = self.pattern_size - len(self.wildcard_pos)
-        self.has_next = True
-        self.forward = True
-        self.orig_context = original_context
-        self.contexts = [[] for _ in range(self.pattern_size)]
-        self.pattern_has_next = [True] * self.pattern_size
-        for i in self.wildcard_pos:
-            self.lv_min_lenghts[i] = 0
-            self.lv_max_lenghts[i] = self.subject_size - self.num_nonlistwildcard
-            self.lv_starts[i] = 0
-            self.lv_lengths[i] = 0
-
-    def add_contexts_to_pattern(self, contexts):
-        self.contexts[self.pattern_cursor].extend(contexts)
-
-    def clear_contexts_for_current_pattern(self):
-        index = self.pattern_cursor
-        if index < 0:
+                matched = [
+                    nc
+                    for c in contexts
+                    for nc in matcher.match_context(subjects, c.copy())
+                    if nc.is_match
+                ]
+            if not matched:
+                continue
+            for c in self.match_from(
+                collection, size, index + 1, start + length, matched, dead
+            ):
+                found = True
+                yield c
+        if not found:
+            for key in keys:
+                if key is not None:
+                    dead[key] = min(start, dead.get(key, start))
+
+    def state_key(self, index, start, context):
+        # the remaining of the match only depends on the position and on the
+        # values bound to the variables of the remaining of the pattern.
+        # An anonymous wildcard can absorb any prefix, if it fails from a
+        # position, it fails from all the next ones: "dead" then holds the
+        # first failing position for the state instead of exact positions
+        variables = self.state_variables[index]
+        if variables is None:
+            return None
+        for generator in context.delayed_matchers:
+            if not variables.isdisjoint(generator.matcher.vars):
+                return None
+        key = (
+            index,
+            None if self.anonymous[index] else start,
+            context.truth,
+            tuple(context._lookup(v) for v in variables),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+
+class Anchor(object):
+    def __init__(self, values):
+        self.values = tuple(values)
+        self.text = None
+        self.data = None
+        # characters and bytes can only be equal to some of the literals
+        if all(isinstance(v, str) and len(v) == 1 for v in values):
+            self.text = "".join(values)
+        elif all(not isinstance(v, str) and v in range(256) for v in values):
+            self.data = bytes(int(v) for v in values)
+
+    def positions(self, collection, start, last):
+        # candidate positions of the anchor between start and last (included),
+        # the matchers still check each of them
+        width = len(self.values)
+        if isinstance(collection, (list, tuple)):
+            yield from self.scan(collection, start, last)
             return
-        self.contexts[index].clear()
-
-    def contexts_for_current_pattern(self):
-        index = self.pattern_cursor - 1
-        if index < 0:
-            return [self.orig_context]
-        return self.contexts[index]
-
-    def decrement_pattern_cursor(self):
-        self.pattern_cursor -= 1
-
-    def decrement_subject_cursor(self):
-        self.subject_cursor -= 1
-
-    def has_next_current_pattern(self):
-        return self.pattern_has_next[self.pattern_cursor]
-
-    def increment_pattern_cursor(self):
-        self.pattern_cursor += 1
-
-    def increment_subject_cursor(self):
-        self.subject_cursor += 1
-
-    def reset_has_next_current_pattern(self):
-        self.pattern_has_next[self.pattern_cursor] = True
-
-    def set_backward(self):
-        self.forward = False
-
-    def set_forward(self):
-        self.forward = True
-
-    def set_has_next_current_pattern(self):
-        self.pattern_has_next[self.pattern_cursor] = False
+        if isinstance(collection, str):
+            needle = self.text
+        elif isinstance(collection, (bytes, bytearray)):
+            needle = self.data
+        else:
+            yield from range(start, last + 1)
+            return
+        if needle is None:
+            return
+        find = collection.find
+        position = find(needle, start, last + width)
+        while position >= 0:
+            yield position
+            position = find(needle, position + 1, last + width)
+
+    def scan(self, collection, start, last):
+        first, values = self.values[0], self.values
+        width = len(values)
+        index = collection.index
+        position = start
+        while position <= last:
+            try:
+                position = index(first, position, last + 1)
+            except ValueError:
+                return
+            if all(collection[position + i] == values[i] for i in range(1, width)):
+                yield position
+            position += 1
 
 
 def as_matcher(obj):
@@ -1,10 +1,87 @@
 # from types import LambdaType
+from asyncio import Semaphore, gather
+from collections import deque
+from contextvars import ContextVar
+from copy import copy
 from functools import lru_cache
+from inspect import iscoroutine
+from re import compile
 
-from .helpers import IdentitySet, flat
+from .helpers import flat
+from .schemas import check_subclasses, children_accessor
+
+awaited_values = ContextVar("awaited_values", default=None)
+accessed_attributes = ContextVar("accessed_attributes", default=None)
+_END = object()
+_ORIGIN = object()
+bounded_recursion = compile(r"(.*)\*\{(\d*)(,?)(\d*)\}")
+
+
+class PendingResolution(Exception):
+    def __init__(self, obj, key, awaitable):
+        super().__init__(obj, key)
+        self.obj = obj
+        self.key = key
+        self.awaitable = awaitable
+
+
+class Resolver(object):
+    def __init__(self, concurrency=None):
+        self.values = {}
+        self.limiter = Semaphore(concurrency) if concurrency else None
+
+    async def resolve(self, obj, key, awaitable):
+        try:
+            _, value = self.values[(id(obj), key)]
+        except KeyError:
+            pass
+        else:
+            if iscoroutine(awaitable):
+                awaitable.close()
+            return value
+        if self.limiter is None:
+            value = await awaitable
+        else:
+            async with self.limiter:
+                value = await awaitable
+        self.values[(id(obj), key)] = (obj, value)
+        return value
+
+    def activate(self):
+        return awaited_values.set(self.values)
+
+    def deactivate(self, token):
+        awaited_values.reset(token)
+
+
+def resolve_awaitable(obj, key, value):
+    values = awaited_values.get()
+    if values is None:
+        return value
+    try:
+        _, result = values[(id(obj), key)]
+    except KeyError:
+        raise PendingResolution(obj, key, value)
+    if iscoroutine(value):
+        value.close()
+    return result
+
+
+def record_access(obj, key):
+    # key is None when any attribute of obj can be read
+    accesses = accessed_attributes.get()
+    if accesses is not None:
+        accesses.setdefault(id(obj), (obj, set()))[1].add(key)
+
+
+def is_awaitable(value):
+    return hasattr(value.__class__, "__await__")
 
 
 class ObjectPath(object):
+    # estimated cost of a navigation, used to order the properties
+    cost = 1
+
     def as_path(self):
         return self
 
@@ -12,24 +89,113 @@ class ObjectPath(object):
     def is_recursive(self):
         return False
 
+    @property
+    def includes_origin(self):
+        return False
+
+    def towards(self, target):
+        return self
+
+    def compile_resolve(self):
+        return self.resolve_from
+
+    def iter_from(self, obj):
+        return self.resolve_from(obj)
+
+    def compile_iter(self):
+        return self.compile_resolve()
+
+    async def aresolve_from(self, obj, resolver):
+        return self.resolve_from(obj)
+
 
 class DictPath(ObjectPath):
     def __init__(self, path):
         self.path = path
 
+    def __str__(self):
+        return str(self.path)
+
+    @property
+    def key(self):
+        return ("key", self.path)
+
     def resolve_from(self, obj):
+        record_access(obj, self.path)
+        try:
+            value = obj.get(self.path, [])
+        except AttributeError:
+            return []
+        if is_awaitable(value):
+            value = resolve_awaitable(obj, self.key, value)
+        return flat(value)
+
+    async def aresolve_from(self, obj, resolver):
         try:
-            return flat(obj.get(self.path, []))
+            value = obj.get(self.path, [])
         except AttributeError:
             return []
+        if is_awaitable(value):
+            value = await resolver.resolve(obj, self.key, value)
+        return flat(value)
+
+    def compile_resolve(self):
+        path, key = self.path, self.key
+        iterable_cls = (list, set, tuple)
+
+        def resolve_from(obj):
+            record_access(obj, path)
+            try:
+                value = obj.get(path, [])
+            except AttributeError:
+                return []
+            if isinstance(value, iterable_cls):
+                return flat(value)
+            if is_awaitable(value):
+                return flat(resolve_awaitable(obj, key, value))
+            return [value]
+
+        return resolve_from
 
 
 class DirectPath(ObjectPath):
     def __init__(self, path):
         self.path = path
 
+    def __str__(self):
+        return str(self.path)
+
+    @property
+    def key(self):
+        return ("attr", self.path)
+
     def resolve_from(self, obj):
-        return flat(getattr(obj, self.path, []))
+        record_access(obj, self.path)
+        value = getattr(obj, self.path, [])
+        if is_awaitable(value):
+            value = resolve_awaitable(obj, self.key, value)
+        return flat(value)
+
+    async def aresolve_from(self, obj, resolver):
+        value = getattr(obj, self.path, [])
+        if is_awaitable(value):
+            value = await resolver.resolve(obj, self.key, value)
+        return flat(value)
+
+    def compile_resolve(self):
+        name, key = self.path, self.key
+        iterable_cls = (list, set, tuple)
+
+        def resolve_from(obj):
+            record_access(obj, name)
+            value = getattr(obj, name, [])
+            if isinstance(value, iterable_cls):
+                return flat(value)
+            if is_awaitable(value):
+                return flat(resolve_awaitable(obj, key, value))
+            return [value]
+
+        return resolve_from
 
 
 # class LambdaPath(ObjectPath):
@@ -50,38 +216,193 @@ class ComposedPath(ObjectPath):
     def __init__(self, paths):
         self.paths = paths
 
+    def __str__(self):
+        return ">".join(str(path) for path in self.paths)
+
+    @property
+    def cost(self):
+        return sum(path.cost for path in self.paths)
+
     def resolve_from(self, obj):
+        return list(self.iter_from(obj))
+
+    def iter_from(self, obj):
+        objects = iter((obj,))
+        for path in self.paths:
+            objects = self.iter_step(path, objects)
+        return objects
+
+    def compile_iter(self):
+        return self.iter_from
+
+    def towards(self, target):
+        last = self.paths[-1].towards(target)
+        if last is self.paths[-1]:
+            return self
+        return self.__class__((*self.paths[:-1], last))
+
+    @staticmethod
+    def iter_step(path, objects):
+        if path.includes_origin:
+            # a recursive step keeps the intermediate objects, they come
+            # before the objects reached from them
+            intermediates = []
+            for intermediate in objects:
+                intermediates.append(intermediate)
+                yield intermediate
+            objects = intermediates
+        for intermediate in objects:
+            try:
+                yield from path.iter_from(intermediate)
+            except PendingResolution:
+                raise
+            except Exception:
+                pass
+
+    async def aresolve_from(self, obj, resolver):
         tmp = [obj]
         for path in self.paths:
-            copy = [*tmp]
-            if not path.is_recursive:
-                tmp.clear()
-            for intermediate in copy:
-                try:
-                    result = path.resolve_from(intermediate)
-                except Exception:
-                    result = []
-                tmp.extend(result)
+            results = await gather(
+                *(self.aresolve_step(path, o, resolver) for o in tmp)
+            )
+            tmp = (tmp if path.includes_origin else []) + [
+                x for r in results for x in r
+            ]
         return tmp
 
+    @staticmethod
+    async def aresolve_step(path, obj, resolver):
+        try:
+            return await path.aresolve_from(obj, resolver)
+        except PendingResolution:
+            raise
+        except Exception:
+            return []
+
 
 class RecursivePath(ObjectPath):
-    def _resolve_from(self, obj, seen, resolved):
-        direct_objects = []
-        o = flat(resolved)
-        res = [x for x in o if x is not None and x not in seen]
-        direct_objects.extend(res)
-        seen |= res
-        if obj not in seen:
-            seen.add(obj)
-        direct_objects.extend(
-            flat([self._resolve_from(x, seen) for x in direct_objects])
-        )
-        return direct_objects
+    orders = ("dfs", "bfs")
+    cost = 100
+
+    def __init__(self, min_depth=0, max_depth=None, order="dfs"):
+        self.check_bounds(min_depth, max_depth, order)
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.order = order
+
+    @classmethod
+    def check_bounds(cls, min_depth, max_depth, order):
+        if order not in cls.orders:
+            raise ValueError(
+                f"Unknown order {order!r}, expected one of {list(cls.orders)}"
+            )
+        if min_depth < 0 or (max_depth is not None and max_depth < min_depth):
+            raise ValueError(f"Invalid depth bounds {{{min_depth},{max_depth}}}")
+
+    def bounded(self, min_depth=None, max_depth=None, order=None):
+        path = copy(self)
+        if min_depth is not None:
+            path.min_depth = min_depth
+        if max_depth is not None:
+            path.max_depth = max_depth
+        if order is not None:
+            path.order = order
+        self.check_bounds(path.min_depth, path.max_depth, path.order)
+        return path
+
+    @property
+    def includes_origin(self):
+        return self.min_depth == 0
+
+    @property
+    def bounds(self):
+        if (self.min_depth, self.max_depth) == (0, None):
+            return ""
+        if self.min_depth == self.max_depth:
+            return f"{{{self.min_depth}}}"
+        high = "" if self.max_depth is None else self.max_depth
+        return f"{{{self.min_depth},{high}}}"
+
+    def iter_from(self, obj):
+        if self.order == "bfs":
+            return self.iter_breadth_first(obj)
+        return self.iter_depth_first(obj)
+
+    def iter_depth_first(self, obj):
+        # explicit stack instead of recursion, deep object graphs do not hit
+        # the recursion limit and each node is produced once, lazily. An
+        # entry is either the values of a node to expand (True) or a level
+        # of new nodes to visit (False).
+        produced, expanded = self.start_visit(obj)
+        stack = [(True, self.iter_values(obj), 0)]
+        while stack:
+            is_values, iterator, depth = stack[-1]
+            item = next(iterator, _END)
+            if item is _END:
+                stack.pop()
+            elif is_values:
+                produce, expand = self.visit(item, depth + 1, produced, expanded)
+                yield from produce
+                if expand:
+                    stack.append((False, iter(expand), depth + 1))
+            else:
+                stack.append((True, self.iter_values(item), depth))
+
+    def iter_breadth_first(self, obj):
+        produced, expanded = self.start_visit(obj)
+        queue = deque(((obj, 0),))
+        while queue:
+            node, depth = queue.popleft()
+            for values in self.iter_values(node):
+                produce, expand = self.visit(values, depth + 1, produced, expanded)
+                yield from produce
+                queue.extend((x, depth + 1) for x in expand)
+
+    def start_visit(self, obj):
+        # the origin can be reached again through a cycle. Without minimum
+        # depth, it is only produced when it is its own direct child (e.g: a
+        # self loop), otherwise it is produced like any other node.
+        if self.min_depth > 0:
+            return {}, {(id(obj), 0): obj}
+        return {id(obj): _ORIGIN}, {id(obj): (0, obj)}
+
+    def visit(self, values, depth, produced, expanded):
+        # a node is produced once, the first time it is reached within the
+        # bounds. It is expanded again only if it is reached by a shorter
+        # walk (bounded depth), or at a different depth below the minimum.
+        min_depth, max_depth = self.min_depth, self.max_depth
+        in_bounds = min_depth <= depth and (max_depth is None or depth <= max_depth)
+        can_expand = max_depth is None or depth < max_depth
+        produce, expand = [], []
+        for x in flat(values):
+            if x is None:
+                continue
+            key = id(x)
+            if in_bounds:
+                previous = produced.get(key, _END)
+                if previous is _END or (previous is _ORIGIN and depth == 1):
+                    produced[key] = x
+                    produce.append(x)
+            if not can_expand:
+                continue
+            if depth < min_depth:
+                key = (key, depth)
+                if key in expanded:
+                    continue
+                expanded[key] = x
+            else:
+                previous = expanded.get(key)
+                if previous is not None and (max_depth is None or previous[0] <= depth):
+                    continue
+                expanded[key] = (depth, x)
+            expand.append(x)
+        return produce, expand
 
     def resolve_from(self, obj):
-        res = self._resolve_from(obj, IdentitySet())
-        return res
+        return list(self.iter_from(obj))
+
+    def compile_iter(self):
+        return self.iter_from
 
     @property
     def is_recursive(self):
@@ -89,33 +410,68 @@ class RecursivePath(ObjectPath):
 
 
 class NamedRecursivePath(RecursivePath):
-    def __init__(self, path):
+    def __init__(self, path, min_depth=0, max_depth=None, order="dfs"):
+        super().__init__(min_depth, max_depth, order)
         self.path = path
 
-    def _resolve_from(self, obj, seen):
-        o = self.path.resolve_from(obj)
-        return super()._resolve_from(obj, seen, o)
+    def __str__(self):
+        return f"{self.path}*{self.bounds}"
 
+    def iter_values(self, obj):
+        return iter((self.path.resolve_from(obj),))
 
-class ChildrenRecursivePath(RecursivePath):
-    def _resolve_from(self, obj, seen):
-        direct_objects = []
+    async def aresolve_from(self, obj, resolver):
+        # the awaitables are resolved concurrently level by level, the
+        # traversal then reuses the resolved values
+        seen = {id(obj)}
+        frontier = [obj]
+        depth = 0
+        while frontier and (self.max_depth is None or depth < self.max_depth):
+            depth += 1
+            levels = await gather(
+                *(self.path.aresolve_from(o, resolver) for o in frontier)
+            )
+            frontier = []
+            for x in (x for level in levels for x in level):
+                if x is not None and id(x) not in seen:
+                    seen.add(id(x))
+                    frontier.append(x)
+        token = resolver.activate()
         try:
-            visit = vars(obj).items()
-        except TypeError:
-            try:
-                visit = {k: getattr(obj, k) for k in obj.__class__.__slots__}.items()
-            except AttributeError:
-                try:
-                    visit = obj.items()
-                except AttributeError:
-                    return []
-        for _, v in visit:
-            direct_objects.extend(super()._resolve_from(obj, seen, v))
-        return direct_objects
+            return self.resolve_from(obj)
+        finally:
+            resolver.deactivate(token)
+
+
+class ChildrenRecursivePath(RecursivePath):
+    def __init__(self, min_depth=0, max_depth=None, order="dfs", target=None):
+        super().__init__(min_depth, max_depth, order)
+        self.target = target
+
+    def __str__(self):
+        return f"*{self.bounds}"
+
+    def towards(self, target):
+        path = copy(self)
+        path.target = target
+        return path
+
+    def iter_from(self, obj):
+        if self.target is not None:
+            check_subclasses()
+        return super().iter_from(obj)
+
+    def iter_values(self, obj):
+        record_access(obj, None)
+        return iter(children_accessor(type(obj), self.target)(obj))
 
 
-def as_path(s, dictkey=False):
+def as_path(s, dictkey=False, min=None, max=None, order=None):
+    if min is not None or max is not None or order is not None:
+        path = as_path(s, dictkey=dictkey)
+        if not isinstance(path, RecursivePath):
+            path = NamedRecursivePath(path)
+        return path.bounded(min, max, order)
     dict_cls = DictPath if dictkey else DirectPath
     if isinstance(s, str) and ">" in s:
         paths = tuple(as_path(p, dictkey=dictkey) for p in s.split(">"))
@@ -126,6 +482,16 @@ def as_path(s, dictkey=False):
         return s.as_path()
     if s == "*":
         return ChildrenRecursivePath()
+    bounds = bounded_recursion.fullmatch(s)
+    if bounds:
+        name, low, comma, high = bounds.groups()
+        if not low and not comma:
+            raise ValueError(f"Missing depth bounds in path {s!r}")
+        min_depth = int(low) if low else 0
+        max_depth = (int(high) if high else None) if comma else min_depth
+        if not name:
+            return ChildrenRecursivePath(min_depth, max_depth)
+        return NamedRecursivePath(as_path(name, dictkey=dictkey), min_depth, max_depth)
     if isinstance(s, str):
         if s[-1] == "*":
             return NamedRecursivePath(as_path(s[:-1], dictkey=dictkey))
@@ -0,0 +1,140 @@
+from .matchers import (
+    DictMatcher,
+    LiteralMatcher,
+    ObjectMatcher,
+    SaveNodeMatcher,
+    as_matcher,
+)
+from .paths import ComposedPath, DictPath, DirectPath, PendingResolution
+
+
+def path_parts(path):
+    if isinstance(path, (DirectPath, DictPath)):
+        return (path,)
+    if isinstance(path, ComposedPath):
+        parts = [path_parts(sub) for sub in path.paths]
+        if None not in parts:
+            return tuple(part for sub in parts for part in sub)
+    return None
+
+
+class PatternSet(object):
+    def __init__(self, patterns):
+        self.patterns = tuple(as_matcher(p) for p in patterns)
+        self.compiled = tuple(p.compile() for p in self.patterns)
+        self.by_type = {}
+        self.by_subclass = []
+        self.generic = []
+        # path key -> (path parts, literal -> tests, ids using the path), a
+        # test is a (pattern id, literal) pair
+        self.tests = {}
+        self.required = [0] * len(self.patterns)
+        self.dispatch = {}
+        for i, pattern in enumerate(self.patterns):
+            matcher = pattern
+            while isinstance(matcher, SaveNodeMatcher):
+                matcher = matcher.matcher
+            if isinstance(matcher, ObjectMatcher):
+                if matcher.subclassmatch:
+                    self.by_subclass.append((matcher.cls, i))
+                else:
+                    self.by_type.setdefault(matcher.cls, []).append(i)
+            else:
+                self.generic.append(i)
+            if isinstance(matcher, (ObjectMatcher, DictMatcher)):
+                self.add_tests(i, matcher.properties)
+
+    def add_tests(self, i, properties):
+        literals = set()
+        for path, matcher in properties:
+            parts = path_parts(path)
+            if parts is None or not isinstance(matcher, LiteralMatcher):
+                continue
+            key = tuple(part.key for part in parts)
+            try:
+                hash(matcher.value)
+            except TypeError:
+                continue
+            if (key, matcher.value) in literals:
+                continue
+            literals.add((key, matcher.value))
+            _, buckets, users = self.tests.setdefault(key, (parts, {}, set()))
+            buckets.setdefault(matcher.value, []).append((i, matcher.value))
+            users.add(i)
+            self.required[i] += 1
+
+    def candidates(self, obj):
+        cls = obj.__class__
+        try:
+            return self.dispatch[cls]
+        except KeyError:
+            pass
+        ids = [*self.by_type.get(cls, ()), *self.generic]
+        ids.extend(i for c, i in self.by_subclass if isinstance(obj, c))
+        self.dispatch[cls] = tuple(sorted(ids))
+        return self.dispatch[cls]
+
+    @staticmethod
+    def resolve(obj, parts, cache):
+        # the paths sharing a same prefix resolve it once
+        values = [obj]
+        for end in range(1, len(parts) + 1):
+            prefix = tuple(part.key for part in parts[:end])
+            try:
+                values = cache[prefix]
+                continue
+            except KeyError:
+                pass
+            part = parts[end - 1]
+            resolved = []
+            for value in values:
+                try:
+                    resolved.extend(part.resolve_from(value))
+                except PendingResolution:
+                    raise
+                except Exception:
+                    pass
+            values = cache[prefix] = resolved
+        return values
+
+    def select(self, obj):
+        candidates = self.candidates(obj)
+        if not self.tests:
+            return candidates
+        remaining = set(candidates)
+        satisfied = [0] * len(self.patterns)
+        cache = {}
+        for parts, buckets, users in self.tests.values():
+            if remaining.isdisjoint(users):
+                continue
+            passed = set()
+            for value in self.resolve(obj, parts, cache):
+                try:
+                    passed.update(buckets.get(value, ()))
+                except TypeError:
+                    for literal, tests in buckets.items():
+                        if value == literal:
+                            passed.update(tests)
+            for i, _ in passed:
+                satisfied[i] += 1
+            # a pattern without any passing test on this path is rejected,
+            # the paths only used by rejected patterns are not resolved
+            remaining -= users.difference(i for i, _ in passed)
+            if not remaining:
+                return []
+        return [
+            i for i in candidates if i in remaining and satisfied[i] >= self.required[i]
+        ]
+
+    def match(self, obj):
+        results = []
+        for i in self.select(obj):
+            result = self.compiled[i].match(obj)
+            if result.is_match:
+                results.append((self.patterns[i], result))
+        return results
+
+    def matches(self, obj):
+        return [
+            self.patterns[i] for i in self.select(obj) if self.compiled[i].matches(obj)
+        ]
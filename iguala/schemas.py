@@ -0,0 +1,180 @@
+import types
+import typing
+from weakref import WeakKeyDictionary
+
+_MISSING = object()
+leaf_types = (int, float, complex, str, bytes, bool, type(None))
+container_types = (list, tuple, set, frozenset, dict)
+# "X | Y" unions (Python >= 3.10) have no __origin__
+union_type = getattr(types, "UnionType", None)
+# analyses per class and target, weakly keyed so dynamically created classes
+# can be collected. They depend on the subclasses known when they were
+# computed, the subclasses counts of the explored classes are kept to detect
+# new ones.
+reachable = WeakKeyDictionary()
+pruned = WeakKeyDictionary()
+accessors = WeakKeyDictionary()
+subclasses_counts = WeakKeyDictionary()
+
+
+def cached(table, cls, target, compute):
+    try:
+        return table[cls][target]
+    except KeyError:
+        pass
+    value = compute(cls, target)
+    table.setdefault(cls, WeakKeyDictionary())[target] = value
+    return value
+
+
+def check_subclasses():
+    # the analyses are dropped as soon as an explored class has new
+    # subclasses (or lost some)
+    for cls, count in list(subclasses_counts.items()):
+        if len(type.__subclasses__(cls)) != count:
+            for table in (reachable, pruned, accessors, subclasses_counts):
+                table.clear()
+            return
+
+
+def slot_names(cls):
+    # the attributes of instances without __dict__ are the slots declared
+    # along the hierarchy, other instances can hold anything
+    names = []
+    for klass in cls.__mro__[:-1]:
+        declared = vars(klass).get("__slots__")
+        if declared is None:
+            return None
+        declared = (declared,) if isinstance(declared, str) else tuple(declared)
+        if "__dict__" in declared:
+            return None
+        names.extend(name for name in declared if name != "__weakref__")
+    return names
+
+
+def fields(cls):
+    # the type hints of the attributes of a closed class: every slot is
+    # annotated and the instances have no __dict__. None otherwise, the
+    # attributes can then hold anything.
+    names = slot_names(cls)
+    if names is None:
+        return None
+    try:
+        hints = typing.get_type_hints(cls)
+    except Exception:
+        return None
+    if any(name not in hints for name in names):
+        return None
+    return {name: hints[name] for name in names}
+
+
+def hint_classes(hint):
+    if hint is None:
+        return (type(None),)
+    if hint is typing.Any:
+        return None
+    origin = getattr(hint, "__origin__", None)
+    if origin is None and union_type is not None and isinstance(hint, union_type):
+        origin = typing.Union
+    if origin is None:
+        # the content of an unparameterized container is unknown
+        if not isinstance(hint, type) or hint in container_types:
+            return None
+        return (hint,)
+    args = getattr(hint, "__args__", ())
+    if not args or any(isinstance(arg, typing.TypeVar) for arg in args):
+        return None
+    if origin is getattr(typing, "Literal", None):
+        return tuple(type(arg) for arg in args)
+    if origin is typing.ClassVar:
+        return None
+    classes = [] if origin is typing.Union else [origin]
+    for arg in args:
+        if arg is Ellipsis:
+            continue
+        arg_classes = hint_classes(arg)
+        if arg_classes is None:
+            return None
+        classes.extend(arg_classes)
+    return tuple(classes) if all(isinstance(c, type) for c in classes) else None
+
+
+def can_reach(cls, target):
+    check_subclasses()
+    return cached(reachable, cls, target, compute_reach)
+
+
+def compute_reach(cls, target):
+    # explores the classes that can be reached from "cls" through its
+    # declared attributes and the subclasses of their types
+    stack, seen = [cls], {cls}
+    while stack:
+        current = stack.pop()
+        if issubclass(current, target) or issubclass(target, current):
+            return True
+        if current in leaf_types or current in container_types:
+            continue
+        hints = fields(current)
+        if hints is None:
+            return True
+        successors = []
+        for hint in hints.values():
+            classes = hint_classes(hint)
+            if classes is None:
+                return True
+            successors.extend(classes)
+        subclasses = type.__subclasses__(current)
+        subclasses_counts.setdefault(current, len(subclasses))
+        successors.extend(subclasses)
+        for successor in successors:
+            if successor not in seen:
+                seen.add(successor)
+                stack.append(successor)
+    return False
+
+
+def pruned_fields(cls, target):
+    check_subclasses()
+    return cached(pruned, cls, target, compute_pruned)
+
+
+def compute_pruned(cls, target):
+    names = set()
+    for name, hint in (fields(cls) or {}).items():
+        classes = hint_classes(hint)
+        if classes is not None and not any(
+            cached(reachable, c, target, compute_reach) for c in classes
+        ):
+            names.add(name)
+    return frozenset(names)
+
+
+def children_accessor(cls, target=None):
+    # called for each visited node, the traversals call check_subclasses()
+    # once when they start. Everything reaches object, nothing is pruned.
+    return cached(
+        accessors, cls, object if target is None else target, compute_accessor
+    )
+
+
+def compute_accessor(cls, target):
+    if target is object:
+        names = frozenset()
+    else:
+        names = cached(pruned, cls, target, compute_pruned)
+    if getattr(cls, "__dictoffset__", 0):
+        if not names:
+            return lambda obj: vars(obj).values()
+        return lambda obj: [v for k, v in vars(obj).items() if k not in names]
+    slots = getattr(cls, "__slots__", None)
+    if slots is not None:
+        slots = (slots,) if isinstance(slots, str) else tuple(slots)
+        slots = tuple(name for name in slots if name not in names)
+        return lambda obj: [
+            v
+            for v in (getattr(obj, name, _MISSING) for name in slots)
+            if v is not _MISSING
+        ]
+    if hasattr(cls, "values"):
+        return lambda obj: obj.values()
+    return lambda obj: ()
@@ -26,6 +26,7 @@ setup(
     package_data={'': ['README.md', 'LICENSE', 'CHANGELOG.md']},
     include_package_data=True,
     tests_require=['pytest'],
+    extras_require={'numpy': ['numpy']},
     license='BSD 3-Clause',
     classifiers=[
         'Development Status :: 4 - Beta',
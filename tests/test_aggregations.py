@@ -0,0 +1,53 @@
+from collections import Counter
+
+from iguala import as_matcher, match
+
+from .data_for_tests import InnerTest, obj_test
+
+nodes = match(obj_test.__class__)[
+    "inner_list>children*" : match(InnerTest)["name":"@name", "value":"@value"]
+]
+
+
+def test_count():
+    assert nodes.count(obj_test) == len(nodes.match(obj_test).bindings)
+    assert nodes.compile().count(obj_test) == nodes.count(obj_test)
+    assert as_matcher([..., "@x", ...]).count([1, 2, 1]) == 3
+    assert as_matcher([..., 3, ...]).count([1, 2, 1]) == 0
+
+
+def test_distinct():
+    pattern = as_matcher([..., "@x", ..., "@y", ...])
+
+    assert pattern.distinct([1, 2, 1], "x") == [1, 2]
+    assert pattern.distinct([1, 2, 1], "x", "y") == [(1, 2), (1, 1), (2, 1)]
+    names = [b["name"] for b in nodes.match(obj_test).bindings]
+    assert nodes.distinct(obj_test, "name") == list(dict.fromkeys(names))
+
+
+def test_group_by():
+    active = match(obj_test.__class__)[
+        "inner_list>children*" : match(InnerTest)["name":"@name", "active":True]
+    ]
+    bindings = active.match(obj_test).bindings
+    assert bindings
+
+    assert active.group_by(obj_test, "name") == Counter(b["name"] for b in bindings)
+
+
+def test_group_by_aggregation():
+    bindings = nodes.match(obj_test).bindings
+    expected = {}
+    for b in bindings:
+        expected[b["name"]] = expected.get(b["name"], 0) + b["value"]
+
+    total = nodes.group_by(obj_test, "name", agg=lambda t, b: t + b["value"])
+    assert total == expected
+
+    pattern = as_matcher([..., "@x", ..., "@y", ...])
+    groups = pattern.group_by([1, 2, 1], "x", "y", agg=lambda l, b: l + [b], initial=[])
+    assert groups == {
+        (1, 2): [{"x": 1, "y": 2}],
+        (1, 1): [{"x": 1, "y": 1}],
+        (2, 1): [{"x": 2, "y": 1}],
+    }
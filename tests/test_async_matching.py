@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from iguala import as_matcher, match
+
+DELAY = 0.05
+
+
+async def fetch(value):
+    await asyncio.sleep(DELAY)
+    return value
+
+
+class Remote(object):
+    def __init__(self, name, children=()):
+        self.name = name
+        self._children = list(children)
+        self.fetches = 0
+
+    @property
+    def children(self):
+        self.fetches += 1
+        return fetch(self._children)
+
+    @property
+    def label(self):
+        return fetch(self.name.upper())
+
+
+def tree():
+    return Remote(
+        "root",
+        [Remote(f"n{i}", [Remote(f"n{i}.{j}") for j in range(5)]) for i in range(5)],
+    )
+
+
+def test_amatch():
+    root = tree()
+    pattern = match(Remote)["children*>name":"@name"]
+
+    result = asyncio.run(pattern.amatch(root))
+
+    names = [b["name"] for b in result.bindings]
+    assert len(names) == 31
+    assert names[0] == "root"
+    assert set(names) == {"root"} | {f"n{i}" for i in range(5)} | {
+        f"n{i}.{j}" for i in range(5) for j in range(5)
+    }
+
+
+def test_amatch_same_as_sync_without_awaitables():
+    pattern = as_matcher({"x": "@x", "l": [..., "@x", ...]})
+    data = {"x": 2, "l": [1, 2, 3, 2]}
+
+    result = asyncio.run(pattern.amatch(data))
+
+    assert result.bindings == pattern.match(data).bindings
+
+
+def test_amatch_overlaps_latency():
+    root = tree()
+    pattern = match(Remote)["children+" : match(Remote)["label":"@label"]]
+
+    start = time.perf_counter()
+    result = asyncio.run(pattern.amatch(root))
+    elapsed = time.perf_counter() - start
+
+    assert len(result.bindings) == 30
+    # 31 "children" and 30 "label" fetches, awaited level by level
+    assert elapsed < 20 * DELAY
+
+
+def test_amatch_concurrency_limit():
+    running = []
+    peak = []
+
+    async def limited(value):
+        running.append(value)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(value)
+        return value
+
+    class Lazy(object):
+        def __init__(self, value):
+            self._value = value
+
+        @property
+        def value(self):
+            return limited(self._value)
+
+    pattern = as_matcher([..., match(Lazy)["value":"@v"], ...])
+    objects = [Lazy(i) for i in range(10)]
+
+    result = asyncio.run(pattern.amatch(objects, concurrency=3))
+
+    assert [b["v"] for b in result.bindings] == list(range(10))
+    assert max(peak) <= 3
+
+
+def test_amatch_generated_matcher():
+    root = tree()
+    pattern = match(Remote)[
+        "name":"@n", "children" : lambda n: match(Remote)["label":"@l"]
+    ]
+
+    result = asyncio.run(pattern.amatch(root))
+
+    assert len(result.bindings) == 5
+    assert result.bindings[0]["l"] == "N0"
+
+
+def test_amatch_generated_matcher_composed_path():
+    root = tree()
+    pattern = match(Remote)[
+        "name":"@n",
+        "children" : lambda n: match(Remote)["children>label":"@l"],
+    ]
+
+    result = asyncio.run(pattern.amatch(root))
+
+    assert len(result.bindings) == 25
+    assert result.bindings[0]["l"] == "N0.0"
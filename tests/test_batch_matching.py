@@ -0,0 +1,41 @@
+from iguala import as_matcher, match
+
+from .data_for_tests import InnerTest, obj_test
+
+
+def test_match_many():
+    pattern = match(InnerTest)["name":"@name", "active":True]
+    objects = obj_test.inner_list
+
+    results = list(pattern.match_many(objects))
+
+    assert [o for o, _ in results] == list(objects)
+    assert [r.bindings for _, r in results] == [
+        pattern.match(o).bindings for o in objects
+    ]
+
+
+def test_match_many_generator():
+    pattern = as_matcher([..., "@x", "@x", ...])
+    objects = ([i, i % 3, i % 3] for i in range(10))
+
+    results = pattern.match_many(objects)
+    obj, result = next(results)
+    assert obj == [0, 0, 0]
+    assert result.bindings == [{"x": 0}, {"x": 0}]
+
+    assert sum(1 for _, r in results if r) == 9
+
+
+def test_filter_many():
+    pattern = match(InnerTest)["active":True]
+
+    matching = list(pattern.filter_many(obj_test.inner_list))
+
+    assert matching == [obj_test.inner_list[0], obj_test.inner_list[1]]
+
+
+def test_filter_many_generator():
+    pattern = as_matcher(range(0, 5))
+
+    assert list(pattern.filter_many(x for x in range(10))) == [0, 1, 2, 3, 4]
@@ -0,0 +1,99 @@
+import pytest
+
+from iguala import as_matcher, cond, extended, is_not, match
+
+from .data_for_tests import InnerTest, obj_test
+
+
+@pytest.mark.parametrize(
+    "pattern, data",
+    [
+        (["@x", "@x"], [1, 1]),
+        (["@x", "@x"], [1, 2]),
+        ([..., "@x", ..., "@x"], [1, 2, 3, 2]),
+        (["@x", is_not("@x")], [2, 2]),
+        (is_not(["@x", is_not("@x")]), [2, 2]),
+        (is_not(["@x", is_not("@x")]), [2, 3]),
+        (match(InnerTest)["name":"@x", "value":"@x"], InnerTest("foo", 3)),
+        (match(InnerTest)["name":"@n", "value":"@v"], InnerTest("foo", 3)),
+        (match(InnerTest)["name":"@n", "value" : lambda n: n], InnerTest("foo", 3)),
+        (
+            match(InnerTest)["value":"@v", "name" : cond(lambda v: v > 4)],
+            obj_test.inner,
+        ),
+        (
+            match(InnerTest)["value":"@v", "name" : cond(lambda v: v > 2)],
+            obj_test.inner,
+        ),
+    ],
+)
+def test_matches_same_as_match(pattern, data):
+    matcher = as_matcher(pattern)
+    assert matcher.matches(data) is bool(matcher.match(data))
+
+
+def test_unread_variables():
+    pattern = match(InnerTest)["name":"@x", "value":"@y", "children":["@x", ...]]
+    assert pattern.unread_variables == {"y"}
+
+    pattern = match(InnerTest)["name":"@x", "value" : cond(lambda x, y: x == y) @ "y"]
+    assert pattern.unread_variables == set()
+
+    pattern = match(InnerTest)["name":"@x", "value" : lambda: "@y"]
+    assert pattern.unread_variables == set()
+
+
+def test_eq_is_boolean():
+    pattern = match(InnerTest)["name":"@name"]
+
+    assert (pattern == obj_test.inner) is True
+    assert (pattern == obj_test) is False
+
+
+def test_not_stops_at_first_positive_match():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = is_not(match(obj_test.__class__)["inner_list>children*" : cond(visit)])
+
+    assert pattern.matches(obj_test) is False
+    assert len(visited) == 1
+
+
+def test_extended():
+    pattern = match(InnerTest)["name":"@name"]
+
+    x = extended(obj_test.inner)
+    assert x == pattern
+    o, result = x
+    assert o is obj_test.inner
+    assert result.bindings == [{"name": "foo"}]
+
+    assert (x == match(InnerTest)["name":"bar"]) is not True
+    o, result = x
+    assert result.is_match is False
+
+
+def test_extended_uses_boolean_mode():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return False
+
+    failing = match(obj_test.__class__)[
+        "inner_list>children*":"@node", "inner": cond(visit)
+    ]
+    x = extended(obj_test)
+    assert (x == failing) is not True
+    assert len(visited) == 1
+    _, result = x
+    assert result.is_match is False
+
+    pattern = match(obj_test.__class__)["inner_list>children*":"@node"]
+    assert x == pattern
+    _, result = x
+    assert result.bindings == pattern.match(obj_test).bindings
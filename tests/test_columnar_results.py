@@ -0,0 +1,67 @@
+import pytest
+
+from iguala import as_matcher, cond, match
+
+from .data_for_tests import InnerTest, obj_test
+
+
+def test_columns_same_as_match():
+    pattern = match(obj_test.__class__)[
+        "inner_list>children*" : match(InnerTest)["name":"@name", "value":"@value"]
+    ]
+
+    result = pattern.match_columns(obj_test)
+    expected = pattern.match(obj_test).bindings
+    assert len(result) == len(expected)
+    assert result.variables == ("name", "value")
+    assert result.bindings == expected
+    assert result.columns["name"] == [b["name"] for b in expected]
+    assert list(result) == [(b["name"], b["value"]) for b in expected]
+    row = next(result.rows())
+    assert (row.name, row.value) == (expected[0]["name"], expected[0]["value"])
+
+
+def test_columns_select_and_missing_values():
+    pattern = as_matcher({"a": "@x"}) | as_matcher({"b": "@y"})
+
+    result = pattern.match_columns({"a": 1, "b": 2})
+    assert result.variables == ("x", "y")
+    assert list(result) == [(1, None), (None, 2)]
+
+    pattern = as_matcher([..., "@x", ...])
+    result = pattern.match_columns([1, 2, 1], select=["x"])
+    assert list(result) == [(1,), (2,)]
+
+
+def test_columns_without_variables():
+    result = as_matcher([..., 1, ...]).match_columns([1, 2, 1])
+    assert result.is_match
+    assert list(result) == [(), ()]
+
+    result = as_matcher([..., 3, ...]).match_columns([1, 2, 1])
+    assert not result
+    assert list(result) == []
+
+
+def test_columns_of_generated_matchers():
+    pattern = as_matcher({"x": lambda: "@z", "y": cond(lambda z: z == 4)})
+
+    result = pattern.match_columns({"x": 4, "y": 4})
+    assert result.variables == ("z",)
+    assert list(result) == [(4,)]
+    assert result.bindings == pattern.match({"x": 4, "y": 4}).bindings
+
+    pattern = as_matcher(["*_", "@a", lambda a: "@b" if a > 1 else 9, "*_"])
+    result = pattern.match_columns([1, 9, 5, 2])
+    assert result.variables == ("a", "b")
+    assert list(result) == [(1, None), (9, 5), (5, 2)]
+
+
+def test_columns_to_numpy():
+    numpy = pytest.importorskip("numpy")
+    pattern = as_matcher({"a": [..., "@x", ...], "b": "@name"})
+
+    array = pattern.match_columns({"a": [1, 2, 3], "b": "foo"}).to_numpy()
+    assert array.dtype.names == ("x", "name")
+    assert numpy.array_equal(array["x"], [1, 2, 3])
+    assert list(array["name"]) == ["foo"] * 3
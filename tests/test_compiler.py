@@ -0,0 +1,68 @@
+from re import Match
+
+import pytest
+
+from iguala import as_matcher, cond, is_, is_not, match, regex
+
+from .data_for_tests import ATest, BTest, InnerTest, dict_test, obj_test
+
+
+def normalize(result):
+    return [
+        {k: v.group(0) if isinstance(v, Match) else v for k, v in b.items()}
+        for b in result.bindings
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern, data",
+    [
+        (match(ATest)["x":4, "y":8], obj_test),
+        (match(ATest)["x":4, "y":9], obj_test),
+        (match(BTest)["x":4], obj_test),
+        ((~match(ATest))["x":4], obj_test),
+        (match(ATest)["x" : is_(4)], obj_test),
+        (match(ATest)["x" : range(0, 5)], obj_test),
+        (match(ATest)["name" : regex("ATest.*")], obj_test),
+        (match(ATest)["name" : regex("(?P<n>AT)") >> "m"], obj_test),
+        (match(ATest)["x":"@x", "y":"@x"], obj_test),
+        (match(ATest)["x":"@_", "y":"@"], obj_test),
+        (match(ATest)["x" : is_not(3), "y" : is_not(8)], obj_test),
+        (match(ATest)["x" : as_matcher(3) | 4, "y" : as_matcher(8) | "@y"], obj_test),
+        (match(ATest)["inner_list" : match(InnerTest)["name":"@n"] @ "i"], obj_test),
+        (match(ATest)["inner_list>children*>name":"@name"], obj_test),
+        (match(ATest)["*" : match(InnerTest)["active":True, "name":"@n"]], obj_test),
+        (match(ATest)["*" : is_not(match(InnerTest)["value":1])], obj_test),
+        (match(ATest)["inner_list" : [match(InnerTest), ...]], obj_test),
+        (match(ATest)["x":"@x", "y" : lambda x: x * 2], obj_test),
+        (
+            match(ATest)["y" : cond(lambda x, __self__: __self__ == x * 2), "x":"@x"],
+            obj_test,
+        ),
+        ({"x": "@x", "inner_list>children*>value": "@x"}, dict_test),
+        ({"inner": {"name": "foo", "value": "@v"}}, dict_test),
+        ({"inner": {"name": "bar"}}, dict_test),
+        ({"inner_list": [{"name": "@n"}, ...]}, dict_test),
+        ({"unknown": "@u"}, dict_test),
+        ([..., "@x", ..., "@x"], [1, 2, 3, 2, 2]),
+        (is_not([..., "@x", ..., is_not("@x"), ...]), [1, 1, 1]),
+    ],
+)
+def test_compiled_same_as_interpreted(pattern, data):
+    matcher = as_matcher(pattern)
+    compiled = matcher.compile()
+
+    assert normalize(compiled(data)) == normalize(matcher.match(data))
+    assert compiled.matches(data) is matcher.matches(data)
+
+
+def test_compile_idempotent():
+    compiled = match(ATest)["x":4].compile()
+    assert compiled.compile() is compiled
+
+
+def test_compiled_as_submatcher():
+    inner = match(InnerTest)["name":"@name"].compile()
+    pattern = match(ATest)["inner":inner]
+
+    assert pattern.match(obj_test).bindings == [{"name": "foo"}]
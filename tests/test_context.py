@@ -0,0 +1,92 @@
+from iguala.matchers import ConditionalMatcher, Context
+
+
+def test_copy_is_independent():
+    context = Context()
+    context["x"] = 1
+
+    copy = context.copy()
+    copy["y"] = 2
+    context["z"] = 3
+
+    assert context.bindings == {"x": 1, "z": 3}
+    assert copy.bindings == {"x": 1, "y": 2}
+    assert "y" not in context
+    assert "z" not in copy
+
+
+def test_copy_shares_bindings():
+    context = Context()
+    context["x"] = 1
+
+    copy1 = context.copy()
+    copy2 = context.copy()
+
+    assert copy1._frames is copy2._frames
+    assert copy1["x"] == copy2["x"] == 1
+
+
+def test_overwrite_and_delete():
+    context = Context()
+    context["x"] = 1
+    copy = context.copy()
+
+    copy["x"] = 2
+    assert copy["x"] == 2
+    assert context["x"] == 1
+
+    del copy["x"]
+    assert "x" not in copy
+    assert len(copy) == 0
+    assert list(context) == ["x"]
+
+    copy["x"] = 3
+    assert copy["x"] == 3
+
+
+def test_deep_copy_chain():
+    context = Context()
+    for i in range(3 * Context.max_depth):
+        context[f"v{i}"] = i
+        context = context.copy()
+
+    assert context._depth <= Context.max_depth
+    assert len(context) == 3 * Context.max_depth
+    assert all(context[f"v{i}"] == i for i in range(3 * Context.max_depth))
+
+
+def test_copy_is_matching():
+    context = Context()
+    context.is_match = False
+
+    assert context.copy().is_match is True
+
+
+def test_delayed_generators_indexed_by_variable():
+    executed = []
+
+    def check(x, y):
+        executed.append((x, y))
+        return x < y
+
+    context = Context()
+    ConditionalMatcher(check).match_context(None, context)
+    ConditionalMatcher(lambda z: True).match_context(None, context)
+    assert set(context._waiting) == {"x", "z"}
+
+    copy = context.copy()
+    copy["x"] = 1
+    assert set(copy._waiting) == {"y", "z"}
+    assert set(context._waiting) == {"x", "z"}
+    assert len(copy.delayed_matchers) == 2
+
+    copy["w"] = 0
+    copy["y"] = 2
+    assert executed == [(1, 2)]
+    assert copy.is_match
+    assert set(copy._waiting) == {"z"}
+
+    context["y"] = 0
+    context["x"] = 1
+    assert executed == [(1, 2), (1, 0)]
+    assert not context.is_match
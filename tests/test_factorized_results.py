@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from iguala import as_matcher, cond, match
+
+
+@dataclass
+class Node(object):
+    name: str
+    values: List[int] = field(default_factory=list)
+
+
+def wide_pattern(width):
+    return as_matcher({f"p{i}": match(Node)["values":f"@v{i}"] for i in range(width)})
+
+
+def test_factorized_same_results_as_match():
+    pattern = as_matcher(
+        {
+            "a": match(Node)["name":"@x", "values":"@y"],
+            "b": match(Node)["values":"@z"],
+        }
+    )
+    obj = {"a": Node("a", [1, 2]), "b": Node("b", [3, 4, 5])}
+
+    result = pattern.factorize(obj)
+    assert len(result.factors) == 2
+    assert result.count() == len(pattern.match(obj).bindings) == 6
+    expected = sorted(pattern.match(obj).bindings, key=lambda b: sorted(b.items()))
+    assert sorted(result, key=lambda b: sorted(b.items())) == expected
+    assert len(result.expand().bindings) == 6
+
+
+def test_factorized_groups_shared_variables():
+    pattern = as_matcher(
+        {
+            "a": match(Node)["values":"@x"],
+            "b": match(Node)["values":"@y"],
+            "c": cond(lambda x, y: x < y),
+        }
+    )
+    obj = {"a": Node("a", [1, 2, 3]), "b": Node("b", [1, 2, 3]), "c": None}
+
+    result = pattern.factorize(obj)
+    assert len(result.factors) == 1
+    assert result.count() == 3
+
+
+def test_factorized_wide_pattern():
+    width = 10
+    pattern = wide_pattern(width)
+    obj = {f"p{i}": Node(str(i), list(range(10))) for i in range(width)}
+
+    result = pattern.factorize(obj)
+    assert result.is_match
+    assert result.count() == 10**width
+    assert {f"v{i}": i for i in range(width)} in result
+    assert {f"v{i}": 0 for i in range(width)} in result
+    assert {f"v{i}": 0 for i in range(width - 1)} not in result
+    assert {**{f"v{i}": 0 for i in range(width)}, "v0": 10} not in result
+    assert {**{f"v{i}": 0 for i in range(width)}, "w": 0} not in result
+    assert next(iter(result)) == {f"v{i}": 0 for i in range(width)}
+
+
+def test_factorized_no_match():
+    pattern = wide_pattern(3)
+    obj = {"p0": Node("0", [1]), "p1": Node("1", []), "p2": Node("2", [2])}
+
+    result = pattern.factorize(obj)
+    assert not result
+    assert result.count() == 0
+    assert list(result) == []
+
+    assert not as_matcher(match(Node)).factorize(3)
+    assert not (match(Node) @ "n").compile().factorize(3)
+
+
+def test_factorized_saved_node():
+    pattern = match(Node)["name":"@name", "values":"@v"] @ "node"
+    node = Node("a", [1, 2])
+
+    result = pattern.compile().factorize(node)
+    assert result.count() == 2
+    assert {"node": node, "name": "a", "v": 2} in result
+
+
+def test_factorized_generated_properties():
+    pattern = as_matcher({"a": lambda: "@x", "b": "@x", "c": "@y"})
+    d = {"a": [1, 2], "b": [2, 3], "c": 4}
+
+    result = pattern.factorize(d)
+    assert len(result.factors) == 1
+    assert list(result) == pattern.match(d).bindings == [{"x": 2, "y": 4}]
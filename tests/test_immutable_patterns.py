@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from iguala import as_matcher, match, regex
+
+from .data_for_tests import ATest, BTest, InnerTest, obj_test
+
+
+def test_matchers_are_frozen():
+    pattern = match(ATest)["x":"@x"]
+
+    with pytest.raises(AttributeError):
+        pattern.properties = ()
+    with pytest.raises(AttributeError):
+        pattern.subclassmatch = True
+    with pytest.raises(AttributeError):
+        del pattern.cls
+    assert isinstance(pattern.properties, tuple)
+
+
+def test_regex_label_creates_new_matcher():
+    pattern = regex("f.*")
+    labelled = pattern >> "m"
+
+    assert labelled is not pattern
+    assert pattern.label is None
+    assert labelled.label == "m"
+
+
+def test_builder_is_not_shared():
+    builder = match(ATest)
+
+    pattern1 = builder % {"x": 4}
+    pattern2 = builder % {"x": 5}
+    sub_pattern = (~builder) % {"x": 4}
+
+    assert pattern1.matches(obj_test)
+    assert not pattern2.matches(obj_test)
+    assert not builder.matcher.subclassmatch
+    assert sub_pattern.subclassmatch
+    assert sub_pattern.matches(BTest(4, 8, "b", None, [], z=3))
+    assert not pattern1.matches(BTest(4, 8, "b", None, [], z=3))
+
+
+def test_compile_is_cached():
+    pattern = match(ATest)["x":4]
+
+    assert pattern.compile() is pattern.compile()
+
+
+def test_thread_pool():
+    pattern = match(ATest)["inner_list>children*" : match(InnerTest)["name":"@n"]]
+    objects = [obj_test] * 20
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(pattern.match_many(objects, executor, chunksize=3))
+
+    expected = pattern.match(obj_test).bindings
+    assert all(r.bindings == expected for _, r in results)
+
+
+def test_thread_pool_by_name():
+    pattern = as_matcher(range(0, 10))
+
+    matching = list(pattern.filter_many(range(20), "thread", ordered=False))
+
+    assert sorted(matching) == list(range(10))
@@ -0,0 +1,104 @@
+from iguala import Index, as_matcher, match
+from iguala.index import bounds
+
+from .data_for_tests import ATest, InnerTest, obj_test
+from .test_schemas import BinOp, Call, Module, Name, Position
+
+
+def build_module():
+    return Module(
+        [
+            BinOp(
+                Call(Name("f"), [Name("x")], Position(1, 2)),
+                Name("y", Position(1, 8)),
+                position=Position(1, 0),
+            ),
+            Call(Name("g"), [Call(Name("f"), position=Position(3, 4))]),
+        ]
+    )
+
+
+def test_index_instances():
+    module = build_module()
+    index = Index(module)
+
+    assert index.nodes[0] is module
+    assert sorted(c.func.id for c in index.instances_of(Call)) == ["f", "f", "g"]
+    assert len(index.instances_of(Name)) == 5
+    assert index.instances_of(ATest) == []
+    assert len(index.instances_of(object, subclasses=True)) == len(index.nodes)
+
+
+def test_index_lookup():
+    module = build_module()
+    index = Index(module, hashed=["id", "line"])
+
+    assert [n.id for n in index.lookup(Name, "id", "f")] == ["f", "f"]
+    assert index.lookup(Name, "id", "nope") == []
+    assert sorted(p.column for p in index.lookup(Position, "line", 1)) == [0, 2, 8]
+    # not indexed, scanned
+    assert [p.line for p in index.lookup(Position, "column", 4)] == [3]
+
+
+def test_index_range():
+    module = build_module()
+    index = Index(module, ordered=["column"])
+
+    found = index.range(Position, "column", range(1, 5))
+    assert sorted(p.column for p in found) == [2, 4]
+    found = index.range(Position, "column", range(0, 9, 4))
+    assert sorted(p.column for p in found) == [0, 4, 8]
+    found = index.range(Position, "column", range(8, 0, -4))
+    assert sorted(p.column for p in found) == [4, 8]
+    assert index.range(Position, "column", range(0)) == []
+    assert index.range(Position, "column", range(0, 9, -1)) == []
+
+
+def test_index_range_bounds_are_not_iterated():
+    module = build_module()
+    index = Index(module, ordered=["column"])
+
+    # iterating such ranges would not finish in a reasonable time
+    found = index.range(Position, "column", range(4, 10**15))
+    assert sorted(p.column for p in found) == [4, 8]
+    found = index.range(Position, "column", range(10**15, 3, -4))
+    assert sorted(p.column for p in found) == [4, 8]
+    assert index.range(Position, "column", range(10**15 - 2, 3, -4)) == []
+    assert bounds(range(10**15, -1, -3)) == (1, 10**15)
+    assert bounds([3, 1, 2]) == (1, 3)
+
+
+def test_findall():
+    module = build_module()
+    index = Index(module, hashed=["id"], ordered=["line"])
+
+    pattern = match(Call)["func>id":"@name", "position>line": range(3, 10)]
+    found = pattern.findall(index)
+    assert len(found) == 1
+    node, result = found[0]
+    assert node.func.id == "f" and node.position.line == 3
+    assert result.bindings == [{"name": "f"}]
+
+    pattern = match(Name)["id":"f"] @ "node"
+    found = pattern.findall(index)
+    assert [node.id for node, _ in found] == ["f", "f"]
+    assert all(result.bindings[0]["node"] is node for node, result in found)
+
+    pattern = match(Position)["line":1]
+    assert len(pattern.findall(index)) == 3
+
+
+def test_findall_same_as_recursive_path():
+    index = Index(obj_test, hashed=["name"], ordered=["value"])
+    patterns = [
+        match(InnerTest)["name":"foo"],
+        match(InnerTest)["value": range(4, 9), "name":"@name"],
+        (~match(object))["active":True],
+        as_matcher("foo"),
+    ]
+    for pattern in patterns:
+        expected = match(ATest)["*": pattern @ "node"].match(obj_test)
+        found = (pattern @ "node").findall(index)
+        assert {id(b["node"]) for b in expected.bindings} == {
+            id(node) for node, _ in found
+        }
@@ -0,0 +1,145 @@
+from iguala import as_matcher, cond, match
+
+from .data_for_tests import InnerTest, obj_test
+
+
+def test_iter_matches_same_as_match():
+    pattern = match(obj_test.__class__)["inner_list>children*>name":"@name"]
+
+    result = pattern.match(obj_test)
+    bindings = [c.bindings for c in pattern.iter_matches(obj_test)]
+
+    assert bindings == result.bindings
+
+
+def test_first():
+    pattern = match(obj_test.__class__)["inner_list" : match(InnerTest)["name":"@name"]]
+
+    context = pattern.first(obj_test)
+    assert context is not None
+    assert context["name"] == "foo"
+
+
+def test_first_no_match():
+    pattern = match(obj_test.__class__)["inner_list" : match(InnerTest)["name":"nope"]]
+
+    assert pattern.first(obj_test) is None
+
+
+def test_first_stops_early():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = as_matcher([..., cond(visit) @ "x", ...])
+
+    context = pattern.first(list(range(100)))
+    assert context["x"] == 0
+    assert len(visited) < 100
+
+
+def test_iter_matches_is_lazy():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = match(obj_test.__class__)["inner_list>children*" : cond(visit)]
+
+    matches = pattern.iter_matches(obj_test)
+    assert visited == []
+
+    next(matches)
+    assert len(visited) == 1
+
+
+def test_match_limit_and_offset():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = as_matcher([..., cond(visit) @ "x", ...])
+    values = list(range(100))
+
+    result = pattern.match(values, limit=5)
+    assert [b["x"] for b in result.bindings] == [0, 1, 2, 3, 4]
+    assert len(visited) < 100
+
+    result = pattern.match(values, limit=5, offset=10)
+    assert [b["x"] for b in result.bindings] == [10, 11, 12, 13, 14]
+
+    result = pattern.match(values, offset=98)
+    assert [b["x"] for b in result.bindings] == [98, 99]
+
+    assert not pattern.match(values, limit=0)
+
+
+def test_match_distinct():
+    pattern = as_matcher([..., "@x", ...]) | as_matcher(["@x", ...])
+    values = [1, 2, 1]
+
+    assert [b["x"] for b in pattern.match(values).bindings] == [1, 2, 1, 1]
+    result = pattern.match(values, distinct=True)
+    assert [b["x"] for b in result.bindings] == [1, 2]
+
+    result = pattern.match(values, distinct=True, limit=1, offset=1)
+    assert [b["x"] for b in result.bindings] == [2]
+
+    pattern = as_matcher([..., "@x", ...])
+    result = pattern.match([[1], [2], [1]], distinct=True)
+    assert [b["x"] for b in result.bindings] == [[1], [2]]
+    contexts = pattern.iter_matches([[1], [1]], distinct=True)
+    assert [c["x"] for c in contexts] == [[1]]
+
+
+def test_match_select():
+    pattern = match(InnerTest)["name":"@name", "children*>name":"@child"]
+    children = [InnerTest(name="a", value=1), InnerTest(name="b", value=2)]
+    root = InnerTest(name="root", value=0, children=children)
+
+    assert len(pattern.match(root).bindings) == 3
+    for p in (pattern, pattern.compile()):
+        result = p.match(root, select=["name"])
+        assert result.bindings == [{"name": "root"}]
+        result = p.match(root, select=["name", "child"])
+        assert result.bindings == [
+            {"name": "root", "child": "root"},
+            {"name": "root", "child": "a"},
+            {"name": "root", "child": "b"},
+        ]
+
+
+def test_match_select_collapses_branches():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = match(obj_test.__class__)["inner_list>children*" : cond(visit) @ "child"]
+    pattern = pattern @ "root"
+
+    result = pattern.match(obj_test)
+    full = len(visited)
+    assert len(result.bindings) > 1
+
+    visited.clear()
+    result = pattern.match(obj_test, select=["root"])
+    assert result.bindings == [{"root": obj_test}]
+    assert len(visited) < full
+
+
+def test_generated_properties_are_not_collapsed():
+    pattern = as_matcher({"a": lambda: "@x", "b": "@x"})
+    d = {"a": [1, 2], "b": [2, 3]}
+
+    assert pattern.match(d).bindings == [{"x": 2}]
+    assert pattern.matches(d)
+    assert pattern == d
+    assert [c.bindings for c in pattern.iter_matches(d, distinct=True)] == [{"x": 2}]
+    assert pattern.match(d, select=["x"]).bindings == [{"x": 2}]
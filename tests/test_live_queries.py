@@ -0,0 +1,116 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from iguala import LiveQuery, Observable, match, notify
+
+
+@dataclass
+class Task(Observable):
+    name: str
+    done: bool = False
+    subtasks: List["Task"] = field(default_factory=list)
+
+
+def test_live_query_results():
+    tasks = [Task("a"), Task("b", done=True), Task("c")]
+    query = match(Task)["done":False, "name":"@name"].live(tasks)
+
+    assert [b["name"] for _, r in query.results for b in r.bindings] == ["a", "c"]
+
+
+def test_live_query_observable():
+    tasks = [Task("a"), Task("b", done=True), Task("c")]
+    evaluated = []
+    query = LiveQuery(
+        match(Task)["done":False],
+        tasks,
+        callback=lambda subject, result: evaluated.append(subject.name),
+    )
+    evaluated.clear()
+
+    tasks[0].done = True
+    assert [t.name for t, _ in query.results] == ["c"]
+    assert evaluated == ["a"]
+
+    tasks[1].done = False
+    assert [t.name for t, _ in query.results] == ["b", "c"]
+    assert evaluated == ["a", "b"]
+
+    # not read by the pattern
+    tasks[2].subtasks = []
+    assert evaluated == ["a", "b"]
+    query.close()
+
+
+def test_live_query_nested_paths():
+    child = Task("child")
+    root = Task("root", subtasks=[Task("other", done=True), child])
+    evaluated = []
+    query = LiveQuery(
+        match(Task)["subtasks*": match(Task)["done":False, "name":"@name"]],
+        [root, Task("alone")],
+        callback=lambda subject, result: evaluated.append(subject.name),
+    )
+    names = sorted(b["name"] for _, r in query.results for b in r.bindings)
+    assert names == ["child"]
+    evaluated.clear()
+
+    child.done = True
+    assert query.results == []
+    assert evaluated == ["root"]
+
+    grandchild = Task("grandchild")
+    child.subtasks.append(grandchild)
+    # lists are not observed, the owner of the list is notified explicitly
+    notify(child, "subtasks")
+    names = sorted(b["name"] for _, r in query.results for b in r.bindings)
+    assert names == ["grandchild"]
+    assert evaluated == ["root", "root"]
+    query.close()
+
+
+def test_live_query_children_path_and_dicts():
+    data = {"items": [{"kind": "a"}, {"kind": "b"}]}
+    query = LiveQuery({"*": {"kind": "@kind"}}, [data])
+    assert sorted(b["kind"] for _, r in query.results for b in r.bindings) == [
+        "a",
+        "b",
+    ]
+
+    data["items"][0]["kind"] = "c"
+    query.notify(data["items"][0], "kind")
+    assert sorted(b["kind"] for _, r in query.results for b in r.bindings) == [
+        "b",
+        "c",
+    ]
+
+
+def test_live_query_add_discard():
+    task = Task("a")
+    query = match(Task)["done":False].live()
+    assert query.results == []
+
+    query.add(task)
+    assert len(query.results) == 1
+
+    query.discard(task)
+    assert query.results == []
+    assert query.readers == {}
+    task.done = True
+    assert query.results == []
+
+
+def test_live_query_compiled_pattern():
+    tasks = [Task("a"), Task("b")]
+    pattern = match(Task)["done":False, "subtasks>name":"@name"]
+    for task in tasks:
+        task.subtasks = [Task(f"{task.name}.0")]
+    query = LiveQuery(pattern.compile(), tasks)
+
+    assert [t.name for t, _ in query.results] == ["a", "b"]
+    assert query.readers
+
+    tasks[0].done = True
+    assert [t.name for t, _ in query.results] == ["b"]
+    tasks[1].subtasks[0].name = "b.1"
+    assert [b["name"] for _, r in query.results for b in r.bindings] == ["b.1"]
@@ -0,0 +1,139 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from iguala import cond, match
+
+
+@dataclass(eq=False)
+class Leaf(object):
+    name: str
+    values: List[int] = field(default_factory=list)
+
+
+@dataclass(eq=False)
+class Branch(object):
+    label: str
+    leaf: Leaf
+
+
+@dataclass(eq=False)
+class Node(object):
+    name: str
+    value: int
+    children: List["Node"] = field(default_factory=list)
+
+
+@dataclass(eq=False)
+class Tree(object):
+    branches: List[Branch] = field(default_factory=list)
+
+
+def shared_tree(size=10):
+    leaf = Leaf("a", [1, 2, 3])
+    return Tree([Branch("a" if i % 2 else "b", leaf) for i in range(size)])
+
+
+def visiting_pattern(visited, leaf_properties=()):
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    leaf = match(Leaf)["values" : cond(visit) @ "v", *leaf_properties]
+    return match(Tree)["branches" : match(Branch)["label":"@label", "leaf":leaf]]
+
+
+def test_shared_subgraph_matched_once():
+    visited = []
+    pattern = visiting_pattern(visited)
+    tree = shared_tree()
+
+    for p in (pattern, pattern.compile()):
+        visited.clear()
+        result = p.match(tree)
+        assert len(result.bindings) == 30
+        # matched on the first visit, remembered on the second one
+        assert len(visited) == 6
+        assert p.count(tree) == 30
+
+    visited.clear()
+    assert len(pattern.match(shared_tree(100)).bindings) == 300
+    assert len(visited) == 6
+
+    visited.clear()
+    lazy = [c.bindings for c in pattern.iter_matches(tree)]
+    assert len(visited) == 30
+    assert lazy == pattern.match(tree).bindings
+
+
+def test_memoization_keyed_by_bound_variables():
+    visited = []
+    pattern = visiting_pattern(visited, [slice("name", "@label")])
+    tree = shared_tree()
+
+    result = pattern.match(tree)
+    assert len(result.bindings) == 15
+    assert {b["label"] for b in result.bindings} == {"a"}
+    # remembered once for each value of "label"
+    assert len(visited) == 9
+
+
+def test_results_recorded_on_first_visit_once_shared():
+    visited = []
+    pattern = visiting_pattern(visited)
+    first, second = Leaf("a", [1, 2, 3]), Leaf("b", [4, 5, 6])
+    tree = Tree([Branch("a", first) for _ in range(5)])
+    tree.branches.extend(Branch("b", second) for _ in range(5))
+
+    result = pattern.match(tree)
+    assert len(result.bindings) == 30
+    # the first shared leaf is matched again when it is reached a second
+    # time, the pattern then records the results of the next leaves directly
+    assert visited == [1, 2, 3, 1, 2, 3, 4, 5, 6]
+
+
+def test_memo_released_after_call():
+    visited = []
+    pattern = visiting_pattern(visited)
+
+    result = pattern.match(shared_tree())
+    assert result.contexts[0].memo == {}
+
+
+def test_memoized_rebinding():
+    root = Node("root", 0, [Node("a", 1), Node("b", 2)])
+    pattern = match(Node) % {"children>value": "@y", "children*": match(Node) @ "y"}
+
+    expected = [c.bindings for c in pattern.iter_matches(root)]
+    assert [b["y"].name for b in expected] == ["a", "b", "a", "b"]
+    assert pattern.match(root).bindings == expected
+    assert pattern.compile().match(root).bindings == expected
+
+
+def test_generated_patterns_not_memoized():
+    tree = shared_tree()
+    pattern = match(Tree)[
+        "branches" : match(Branch)[
+            "label":"@label",
+            "leaf" : match(Leaf)["name" : lambda: "@label", "values":"@v"],
+        ]
+    ]
+
+    assert len(pattern.match(tree).bindings) == 15
+    assert pattern.match(tree).bindings == [
+        c.bindings for c in pattern.iter_matches(tree)
+    ]
+
+
+def test_memoized_pattern_waking_up_generators():
+    tree = shared_tree()
+    pattern = match(Tree)[
+        "branches" : match(Branch)[
+            "label" : lambda v: "a" if v > 1 else "b",
+            "leaf" : match(Leaf)["values":"@v"],
+        ]
+    ]
+
+    expected = [c.bindings for c in pattern.iter_matches(tree)]
+    assert len(expected) == 15
+    assert pattern.match(tree).bindings == expected
+    assert pattern.compile().match(tree).bindings == expected
@@ -1,4 +1,9 @@
-from iguala import as_matcher, match
+import warnings
+
+import pytest
+
+from iguala import as_matcher, cond, match
+from iguala.matchers import UnboundVariableWarning
 
 from .data_for_tests import obj_test
 
@@ -65,7 +70,8 @@ def test_lambda_matcher_uncomplete():
 def test_lambda_matcher_uncomplete():
     pattern = match(obj_test.__class__) % {"x": 4, "y": as_matcher(lambda x: x * 8)}
 
-    result = pattern.match(obj_test)
+    with pytest.warns(UnboundVariableWarning, match="misses variables"):
+        result = pattern.match(obj_test)
     assert result.is_match
 
     bindings = result.bindings[0]
@@ -121,3 +127,50 @@ def test_lambda_matcher_desorder4():
 
     result = pattern.match(obj_test)
     assert result.is_match is False
+
+
+def test_unbound_variables_reported_once():
+    pattern = match(obj_test.__class__) % {
+        "x": "@x",
+        "y": as_matcher(lambda x, z: x == z),
+    }
+
+    assert [sorted(missing) for _, missing in pattern.unbound_variables] == [["z"]]
+    with pytest.warns(UnboundVariableWarning):
+        pattern.match(obj_test)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        pattern.match(obj_test)
+
+    pattern = match(obj_test.__class__) % {"x": "@x", "y": as_matcher(lambda x: x)}
+    assert pattern.unbound_variables == ()
+
+
+def test_unbound_variables_reported_by_every_entry_point():
+    def build():
+        return match(obj_test.__class__) % {
+            "x": "@x",
+            "y": as_matcher(lambda x, z: x == z),
+        }
+
+    for run in (
+        lambda pattern: pattern.first(obj_test),
+        lambda pattern: pattern.iter_matches(obj_test),
+        lambda pattern: pattern.matches(obj_test),
+        lambda pattern: pattern == obj_test,
+    ):
+        with pytest.warns(UnboundVariableWarning):
+            run(build())
+
+
+def test_variables_bound_by_generators_not_reported():
+    pattern = match(obj_test.__class__) % {
+        "x": lambda: "@z",
+        "y": cond(lambda z: z == 4),
+    }
+
+    assert pattern.unbound_variables == ()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = pattern.match(obj_test)
+    assert result.bindings == [{"z": 4}]
@@ -0,0 +1,131 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from iguala import as_matcher, batch, cond, match, register
+from iguala.matchers import ConditionalMatcher, MatcherGenerator
+
+from .data_for_tests import InnerTest
+
+succ = register(lambda x: x + 1, name="tests.succ")
+
+
+@register
+def is_even(__self__):
+    return __self__ % 2 == 0
+
+
+def test_register():
+    assert cond("tests.succ").fun is succ
+    assert cond(f"{__name__}.is_even").fun is is_even
+
+
+def test_pickle_registered_lambdas():
+    pattern = match(InnerTest)["value":"@x", "children":[..., succ, ...]]
+
+    restored = pickle.loads(pickle.dumps(pattern))
+
+    assert restored.match(InnerTest("a", 1, children=[2])).bindings == [{"x": 1}]
+    _, matcher = restored.properties[1]
+    assert isinstance(matcher.sequence[1], MatcherGenerator)
+    assert matcher.sequence[1].fun is succ
+
+
+def test_pickle_unregistered_lambda():
+    pattern = match(InnerTest)["value" : cond(lambda __self__: __self__ > 2)]
+
+    with pytest.raises(pickle.PicklingError):
+        pickle.dumps(pattern)
+
+
+def test_pickle_compiled():
+    pattern = as_matcher([..., "@x", cond(is_even)]).compile()
+
+    restored = pickle.loads(pickle.dumps(pattern))
+
+    assert restored([1, 3, 4]).bindings == [{"x": 3}]
+    assert isinstance(restored.matcher.sequence[2], ConditionalMatcher)
+
+
+def test_pickle_compiled_object_pattern():
+    pattern = match(InnerTest) % {"value": 4, "name": "@n"}
+    compiled = pattern.compile()
+    assert compiled(InnerTest("a", 4)).bindings == [{"n": "a"}]
+
+    for obj in (compiled, pattern):
+        restored = pickle.loads(pickle.dumps(obj))
+        assert restored.match(InnerTest("b", 4)).bindings == [{"n": "b"}]
+    assert pickle.loads(pickle.dumps(compiled)).matcher.cls is InnerTest
+
+
+def test_pickle_after_match():
+    pattern = match(InnerTest) % {"value": 4, "name": "@n"}
+    assert pattern.match(InnerTest("a", 4)).bindings == [{"n": "a"}]
+
+    restored = pickle.loads(pickle.dumps(pattern))
+
+    assert "_plan" not in restored.__dict__
+    assert restored.match(InnerTest("b", 4)).bindings == [{"n": "b"}]
+    assert not restored.match(InnerTest("b", 3))
+
+
+def test_pickle_result():
+    result = as_matcher(["@x", lambda x: x + 1]).match([1, 2])
+
+    restored = pickle.loads(pickle.dumps(result))
+
+    assert restored.is_match
+    assert restored.bindings == [{"x": 1}]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_process_pool(ordered):
+    pattern = as_matcher([..., "@x", succ, ...])
+    objects = [[i, i + 1, i % 3] for i in range(50)]
+
+    with ProcessPoolExecutor(2) as executor:
+        results = list(
+            pattern.match_many(objects, executor, chunksize=7, ordered=ordered)
+        )
+
+    expected = list(pattern.match_many(objects))
+    if not ordered:
+        results.sort(key=lambda r: r[0])
+    assert [o for o, _ in results] == [o for o, _ in expected]
+    assert [r.bindings for _, r in results] == [r.bindings for _, r in expected]
+
+
+def test_process_pool_filter():
+    pattern = as_matcher(cond(is_even))
+
+    matching = list(pattern.filter_many(range(100), "process", chunksize=10))
+
+    assert matching == list(range(0, 100, 2))
+
+
+def test_worker_pattern_compiled_once():
+    pattern = match(InnerTest) % {"value": 4, "name": "@n"}
+    payload = ("key", pickle.dumps(pattern))
+
+    compiled = batch.worker_pattern(payload)
+    assert batch.worker_pattern(payload) is compiled
+    assert batch.worker_pattern("key") is compiled
+    assert compiled(InnerTest("a", 4)).bindings == [{"n": "a"}]
+    assert batch.worker_pattern(pattern) is pattern.compile()
+    del batch.worker_patterns["key"]
+
+
+def test_process_pool_pattern_already_used():
+    pattern = match(InnerTest) % {"value": 4, "name": "@n"}
+    objects = [InnerTest(str(i), i % 5) for i in range(20)]
+    expected = [r.bindings for _, r in pattern.match_many(objects)]
+
+    results = pattern.match_many(objects, "process", chunksize=3, max_workers=2)
+
+    assert [r.bindings for _, r in results] == expected
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        list(as_matcher(3).match_many([3], "gpu"))
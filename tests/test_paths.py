@@ -1,6 +1,6 @@
 import pytest
 
-from iguala import match
+from iguala import cond, match
 from iguala.paths import (
     ChildrenRecursivePath,
     ComposedPath,
@@ -10,7 +10,7 @@ from iguala.paths import (
     as_path,
 )
 
-from .data_for_tests import dict_test, obj_test
+from .data_for_tests import InnerTest, dict_test, obj_test
 
 
 def test_as_path_direct_dict_composed():
@@ -466,3 +466,183 @@ def test_resolve_unexisting():
     p = as_path("name>unexisting")
 
     assert p.resolve_from(obj_test) == []
+
+
+def deep_chain(depth):
+    root = InnerTest(name="0", value=0)
+    current = root
+    for i in range(1, depth):
+        child = InnerTest(name=str(i), value=i)
+        current.children = [child]
+        current = child
+    return root
+
+
+def test_recursive_path_deep_chain():
+    root = deep_chain(50000)
+
+    res = as_path("children*").resolve_from(root)
+    assert len(res) == 49999
+    assert res[-1].name == "49999"
+
+    res = as_path("*").resolve_from(root)
+    assert len([x for x in res if isinstance(x, InnerTest)]) == 49999
+
+    matcher = match(InnerTest)["children*>name":"49999"]
+    assert matcher.match(root).is_match
+    assert matcher.compile().matches(root)
+
+
+def test_recursive_path_cycle():
+    a = InnerTest(name="a", value=0)
+    b = InnerTest(name="b", value=1, children=[a])
+    a.children = [b, b]
+
+    res = as_path("children*").resolve_from(a)
+    assert len(res) == 1
+    assert res[0] is b
+
+
+def test_recursive_path_is_lazy():
+    root = deep_chain(10)
+
+    nodes = as_path("children*").iter_from(root)
+    assert next(nodes).name == "1"
+    assert next(nodes).name == "2"
+
+
+def tree(depth, width=2, name="n"):
+    node = InnerTest(name=name, value=depth)
+    if depth > 0:
+        node.children = [
+            tree(depth - 1, width, f"{name}.{i}") for i in range(width)
+        ]
+    return node
+
+
+def test_as_path_bounded_recursion():
+    path = as_path("children*{1,3}")
+    assert isinstance(path, NamedRecursivePath)
+    assert path.path.path == "children"
+    assert (path.min_depth, path.max_depth, path.order) == (1, 3, "dfs")
+
+    path = as_path("children*{2}")
+    assert (path.min_depth, path.max_depth) == (2, 2)
+
+    path = as_path("children*{2,}")
+    assert (path.min_depth, path.max_depth) == (2, None)
+
+    path = as_path("children*{,2}")
+    assert (path.min_depth, path.max_depth) == (0, 2)
+
+    path = as_path("*{0,2}")
+    assert isinstance(path, ChildrenRecursivePath)
+    assert (path.min_depth, path.max_depth) == (0, 2)
+
+    path = as_path("children", min=1, max=3, order="bfs")
+    assert isinstance(path, NamedRecursivePath)
+    assert (path.min_depth, path.max_depth, path.order) == (1, 3, "bfs")
+
+    path = as_path("x>children*{0,1}")
+    assert isinstance(path.paths[1], NamedRecursivePath)
+    assert path.paths[1].max_depth == 1
+
+    with pytest.raises(ValueError):
+        as_path("children*{}")
+    with pytest.raises(ValueError):
+        as_path("children*{3,1}")
+    with pytest.raises(ValueError):
+        as_path("children", order="random")
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("children*{1}", ["n.0", "n.1"]),
+        ("children*{,2}", ["n.0", "n.1", "n.0.0", "n.0.1", "n.1.0", "n.1.1"]),
+        ("children*{2}", ["n.0.0", "n.0.1", "n.1.0", "n.1.1"]),
+        (
+            "children*{3,}",
+            ["n.0.0.0", "n.0.0.1", "n.0.1.0", "n.0.1.1"]
+            + ["n.1.0.0", "n.1.0.1", "n.1.1.0", "n.1.1.1"],
+        ),
+        ("children*{0,1}>name", ["n", "n.0", "n.1"]),
+        ("children*{1,1}>name", ["n.0", "n.1"]),
+    ],
+)
+def test_bounded_recursive_path(path, expected):
+    root = tree(3)
+    res = as_path(path).resolve_from(root)
+    assert [x if isinstance(x, str) else x.name for x in res] == expected
+
+
+def test_bounded_recursive_path_shorter_walk():
+    # c is first reached at depth 3 by a depth first traversal, its child
+    # is still within 3 hops through the shortcut a -> c
+    d = InnerTest(name="d", value=0)
+    c = InnerTest(name="c", value=0, children=[d])
+    b2 = InnerTest(name="b2", value=0, children=[c])
+    b1 = InnerTest(name="b1", value=0, children=[b2])
+    a = InnerTest(name="a", value=0, children=[b1, c])
+
+    res = as_path("children*{,2}").resolve_from(a)
+    assert sorted(x.name for x in res) == ["b1", "b2", "c", "d"]
+
+    res = as_path("children*{3}").resolve_from(a)
+    assert sorted(x.name for x in res) == ["c"]
+
+
+def test_breadth_first_recursive_path():
+    root = tree(3)
+
+    res = as_path("children", order="bfs").resolve_from(root)
+    names = [x.name for x in res]
+    assert names[:6] == ["n.0", "n.1", "n.0.0", "n.0.1", "n.1.0", "n.1.1"]
+    assert len(res) == 14
+
+    res = as_path("*", order="bfs").resolve_from(root)
+    assert [x.name for x in res if isinstance(x, InnerTest)][:2] == ["n.0", "n.1"]
+
+
+def test_breadth_first_stops_early():
+    root = deep_chain(1000)
+    root.children.append(InnerTest(name="target", value=0))
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return __self__.name == "target"
+
+    pattern = match(InnerTest)[as_path("children", order="bfs") : cond(visit)]
+    assert pattern.first(root) is not None
+    assert len(visited) < 5
+
+
+def test_bounded_recursive_path_cycle():
+    a = InnerTest(name="a", value=0)
+    a.children = [a]
+
+    for order in ("dfs", "bfs"):
+        res = as_path("children*{1}", order=order).resolve_from(a)
+        assert [x.name for x in res] == ["a"]
+
+    b = InnerTest(name="b", value=1, children=[a])
+    a.children = [b]
+    assert [x.name for x in as_path("children>children").resolve_from(a)] == ["a"]
+    for order in ("dfs", "bfs"):
+        res = as_path("children*{2}", order=order).resolve_from(a)
+        assert [x.name for x in res] == ["a"]
+        res = as_path("children*{1,}", order=order).resolve_from(a)
+        assert [x.name for x in res] == ["b", "a"]
+
+
+def test_recursive_path_self_loop():
+    a = InnerTest(name="a", value=0)
+    a.children = [a]
+
+    assert as_path("children*").resolve_from(a) == [a]
+    assert as_path("children*>name").resolve_from(a) == ["a", "a"]
+
+    b = InnerTest(name="b", value=1, children=[a])
+    a.children = [b]
+    assert as_path("children*").resolve_from(a) == [b]
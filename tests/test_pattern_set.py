@@ -0,0 +1,82 @@
+from iguala import PatternSet, as_matcher, cond, is_not, match
+
+from .data_for_tests import ATest, BTest, InnerTest, obj_test
+from .test_schemas import Call, Name, Position
+
+
+def test_pattern_set_same_as_match():
+    patterns = [
+        match(ATest)["x":4, "name":"@name"],
+        match(ATest)["x":5],
+        match(ATest)["inner_list>name":"foo", "inner_list>value":"@v"],
+        match(ATest)["inner_list>name":"nope"],
+        match(ATest)["inner>name":"foo", "inner>value":3] @ "node",
+        (~match(object))["x":4],
+        match(InnerTest)["name":"foo"],
+        {"x": 4},
+        as_matcher([...]),
+        match(ATest)["x": cond(lambda __self__: __self__ > 3)],
+        match(ATest)["name": is_not("ATest name")],
+    ]
+    patternset = PatternSet(patterns)
+
+    results = patternset.match(obj_test)
+    expected = [
+        (p, p.match(obj_test)) for p in patternset.patterns if p.match(obj_test)
+    ]
+    assert [p for p, _ in results] == [p for p, _ in expected]
+    assert [r.bindings for _, r in results] == [r.bindings for _, r in expected]
+    assert patternset.matches(obj_test) == [p for p, _ in expected]
+    assert [patternset.patterns.index(p) for p, _ in results] == [0, 2, 4, 5, 9]
+
+
+def test_pattern_set_dispatch():
+    patterns = [
+        match(ATest)["x":4],
+        ~match(ATest),
+        match(InnerTest),
+        match(Call)["func>id":"f"],
+    ]
+    patternset = PatternSet(patterns)
+    b = BTest(x=4, y=0, name="", inner=None, inner_list=[], z=0)
+
+    assert patternset.candidates(obj_test) == (0, 1)
+    assert patternset.candidates(b) == (1,)
+    assert patternset.candidates(Call(Name("f"))) == (3,)
+    assert patternset.matches(b) == [patterns[1].as_matcher()]
+
+
+def test_pattern_set_literal_tests():
+    patterns = [match(Call)["func>id":name] for name in "abcdefgh"]
+    patterns.append(match(Call)["func>id":"a", "position>line":1])
+    patterns.append(match(Call)["args>id":"x", "args>id":"y"])
+    patternset = PatternSet(patterns)
+
+    call = Call(Name("a"), [Name("x"), Name("y")], Position(1, 0))
+    assert patternset.select(call) == [0, 8, 9]
+    assert len(patternset.match(call)) == 3
+
+    call = Call(Name("h"), [Name("x")], Position(2, 0))
+    assert patternset.select(call) == [7]
+
+
+def test_pattern_set_skips_rejected_patterns():
+    reads = []
+
+    class Node(object):
+        def __init__(self, kind):
+            self.kind = kind
+
+        @property
+        def size(self):
+            reads.append(self)
+            return 1
+
+    patternset = PatternSet(
+        [match(Node)["kind":"a", "size":1], match(Node)["kind":"b", "size":1]]
+    )
+
+    assert patternset.select(Node("c")) == []
+    assert reads == []
+    assert patternset.select(Node("b")) == [1]
+    assert len(reads) == 1
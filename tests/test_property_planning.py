@@ -0,0 +1,68 @@
+from iguala import cond, match, regex
+
+from .data_for_tests import ATest, InnerTest, obj_test
+
+
+def test_plan_checks_tests_first():
+    pattern = match(ATest)[
+        "inner_list>children*>name":"@n",
+        "inner>name":"foo",
+        "x":4,
+        "name": regex("ATest.*"),
+        "y":"@y",
+    ]
+
+    assert [index for index, _ in pattern.plan] == [2, 3, 1]
+
+
+def test_plan_skips_expensive_properties():
+    visited = []
+
+    def visit(__self__):
+        visited.append(__self__)
+        return True
+
+    pattern = match(ATest)["inner_list>children*": cond(visit), "x":5]
+
+    assert not pattern.match(obj_test)
+    assert not pattern.compile().match(obj_test)
+    assert visited == []
+
+    pattern = match(ATest)["inner_list>children*": cond(visit) @ "c", "x":4]
+    assert len(pattern.match(obj_test).bindings) == len(visited) > 0
+
+
+def test_plan_keeps_results_order():
+    pattern = match(ATest)[
+        "inner_list>children*>name":"@n",
+        "inner_list>value": range(0, 10),
+        "inner_list>name":"@m",
+    ]
+
+    result = pattern.match(obj_test)
+    compiled = pattern.compile().match(obj_test)
+    in_range = [i for i in obj_test.inner_list if i.value in range(0, 10)]
+    expected = [
+        {"n": n, "m": i.name}
+        for n in pattern.properties[0][0].resolve_from(obj_test)
+        for _ in in_range
+        for i in obj_test.inner_list
+    ]
+    assert result.bindings == expected
+    assert compiled.bindings == expected
+
+
+def test_explain():
+    pattern = match(ATest)[
+        "inner_list>children*": match(InnerTest)["name":"@n"] @ "child",
+        "x":4,
+    ]
+
+    assert pattern.explain() == "\n".join(
+        [
+            "match(ATest)",
+            "  check x: == 4",
+            "  match inner_list>children*: match(InnerTest) @ child",
+            "    match name: @n",
+        ]
+    )
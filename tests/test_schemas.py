@@ -0,0 +1,248 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from iguala import as_path, match
+from iguala.paths import ChildrenRecursivePath
+from iguala.schemas import can_reach, children_accessor, hint_classes, pruned_fields
+
+
+class Position(object):
+    __slots__ = ("line", "column")
+    line: int
+    column: int
+
+    def __init__(self, line, column):
+        self.line = line
+        self.column = column
+
+
+class Name(object):
+    __slots__ = ("id", "position")
+    id: str
+    position: Optional[Position]
+
+    def __init__(self, id, position=None):
+        self.id = id
+        self.position = position
+
+
+class Call(object):
+    __slots__ = ("func", "args", "position")
+    func: Name
+    args: List["Expr"]
+    position: Optional[Position]
+
+    def __init__(self, func, args=None, position=None):
+        self.func = func
+        self.args = [] if args is None else args
+        self.position = position
+
+
+class BinOp(object):
+    __slots__ = ("left", "right", "op", "position")
+    left: "Expr"
+    right: "Expr"
+    op: str
+    position: Optional[Position]
+
+    def __init__(self, left, right, op="+", position=None):
+        self.left = left
+        self.right = right
+        self.op = op
+        self.position = position
+
+
+Expr = Union[Name, Call, BinOp]
+
+
+class Module(object):
+    __slots__ = ("body", "comments", "extra")
+    body: List[Expr]
+    comments: Dict[int, str]
+    extra: Any
+
+    def __init__(self, body, comments=None, extra=None):
+        self.body = body
+        self.comments = {} if comments is None else comments
+        self.extra = extra
+
+
+class Opaque(object):
+    def __init__(self, value):
+        self.value = value
+
+
+def test_hint_classes():
+    assert hint_classes(int) == (int,)
+    assert hint_classes(Optional[int]) == (int, type(None))
+    assert hint_classes(List[Name]) == (list, Name)
+    assert hint_classes(Any) is None
+    assert hint_classes(List) is None
+
+
+def test_can_reach():
+    assert can_reach(Module, Call)
+    assert can_reach(BinOp, Call)
+    assert not can_reach(Position, Call)
+    assert not can_reach(Name, Call)
+    assert can_reach(Opaque, Call)
+    assert can_reach(object, Call)
+
+
+def test_pruned_fields():
+    assert pruned_fields(BinOp, Call) == {"op", "position"}
+    assert pruned_fields(Module, Call) == {"comments"}
+    assert pruned_fields(Call, Position) == set()
+
+
+def test_children_accessor():
+    call = Call(Name("f"), position=Position(1, 2))
+
+    assert list(children_accessor(Call)(call)) == [call.func, [], call.position]
+    assert list(children_accessor(Call, Call)(call)) == [[]]
+    assert list(children_accessor(dict)({"a": 1})) == [1]
+    assert list(children_accessor(int)(3)) == []
+
+
+def test_children_path_towards_matched_type():
+    pattern = match(Module)["*": match(Call)["func>id":"@name"]]
+
+    path = pattern.properties[0][0]
+    assert isinstance(path, ChildrenRecursivePath)
+    assert path.target is Call
+    assert as_path("*").target is None
+
+
+def test_pruned_traversal_same_matches():
+    inner = Call(Name("g"), [Name("x")], Position(2, 1))
+    tree = Module(
+        [
+            BinOp(Call(Name("f"), [inner]), Name("y"), position=Position(1, 1)),
+            Call(Name("h")),
+        ],
+        extra=Opaque(Call(Name("i"))),
+    )
+    pattern = match(Module)["*": match(Call)["func>id":"@name"]]
+
+    result = pattern.match(tree)
+    assert sorted(b["name"] for b in result.bindings) == ["f", "g", "h", "i"]
+    assert pattern.compile().matches(tree)
+
+    pruned = ChildrenRecursivePath().towards(Call).resolve_from(tree)
+    unpruned = ChildrenRecursivePath().resolve_from(tree)
+    assert len(pruned) < len(unpruned)
+    assert [x for x in pruned if isinstance(x, Call)] == [
+        x for x in unpruned if isinstance(x, Call)
+    ]
+
+
+def test_subclass_defined_after_match():
+    @dataclass
+    class Annotation(object):
+        __slots__ = ("text",)
+        text: str
+
+    @dataclass
+    class Decorated(object):
+        __slots__ = ("annotation",)
+        annotation: Annotation
+
+    pattern = match(Decorated)["*" : ~match(Call) @ "call"]
+    assert not pattern.match(Decorated(Annotation("a")))
+    assert not can_reach(Annotation, Call)
+
+    @dataclass
+    class CallAnnotation(Annotation):
+        __slots__ = ("call",)
+        call: Call
+
+    call = Call(Name("f"))
+    result = pattern.match(Decorated(CallAnnotation("a", call)))
+    assert [b["call"] for b in result.bindings] == [call]
+    assert can_reach(Annotation, Call)
+
+
+def test_dynamic_classes_are_collected():
+    import gc
+    import weakref
+
+    from iguala import schemas
+
+    @dataclass
+    class Temporary(object):
+        __slots__ = ("position",)
+        position: Position
+
+    assert not can_reach(Temporary, Call)
+    assert list(children_accessor(Temporary, Call)(Temporary(Position(1, 1)))) == []
+    ref = weakref.ref(Temporary)
+    del Temporary
+    gc.collect()
+    assert ref() is None
+    assert all(ref() is not cls for cls in schemas.reachable)
+
+
+class Target(object):
+    pass
+
+
+class Box(object):
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+
+@dataclass
+class BoxHolder(object):
+    box: Box
+
+
+@dataclass
+class Holder(object):
+    position: Position
+
+
+@dataclass
+class HolderHolder(object):
+    holder: Holder
+
+
+class Plain(object):
+    child: int
+
+    def __init__(self, child):
+        self.child = child
+
+
+@dataclass
+class PlainHolder(object):
+    plain: Plain
+
+
+def test_unannotated_slot_is_explored():
+    target = Target()
+    pattern = match(BoxHolder)["*" : match(Target) @ "t"]
+
+    assert can_reach(Box, Target)
+    assert [b["t"] for b in pattern.match(BoxHolder(Box(target))).bindings] == [target]
+
+
+def test_runtime_attribute_is_explored():
+    target = Target()
+    holder = Holder(Position(1, 1))
+    holder.extra = target
+    pattern = match(HolderHolder)["*" : match(Target) @ "t"]
+
+    assert can_reach(Holder, Target)
+    assert [b["t"] for b in pattern.match(HolderHolder(holder)).bindings] == [target]
+
+
+def test_open_class_annotations_are_ignored():
+    target = Target()
+    pattern = match(PlainHolder)["*" : match(Target) @ "t"]
+
+    assert pruned_fields(Plain, Target) == set()
+    assert [b["t"] for b in pattern.match(PlainHolder(Plain(target))).bindings] == [
+        target
+    ]
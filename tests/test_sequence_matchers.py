@@ -1,6 +1,6 @@
 import pytest
 
-from iguala import as_matcher, is_not, match
+from iguala import as_matcher, cond, is_not, match
 
 
 class A(object):
@@ -102,3 +102,50 @@ def test_ellipsis_list(pattern, data, expected, variables):
     for ctx, bindings in zip(variables, result.bindings):
         for var, val in ctx.items():
             assert bindings[var] == val
+
+
+def test_repeated_list_variables():
+    matcher = as_matcher(["*x", "*x", "*z"])
+    result = matcher.match([0, 0])
+
+    assert result.bindings == [{"x": [], "z": [0, 0]}, {"x": [0], "z": []}]
+
+
+def test_many_wildcards_on_long_list():
+    matcher = as_matcher([..., 0, ..., 0, ..., 0, ..., 1])
+    assert matcher.match([0] * 5000).is_match is False
+
+    matcher = as_matcher([..., 9998, "@x", ...])
+    result = matcher.match(list(range(10000)))
+    assert result.bindings == [{"x": 9999}]
+
+
+def test_wildcards_with_conditions():
+    succ = cond(lambda x, __self__: __self__ == x + 1)
+    matcher = as_matcher([..., "@x", ..., succ, ...])
+    result = matcher.match([1, 3, 2, 4])
+
+    assert [b["x"] for b in result.bindings] == [1, 3]
+
+
+@pytest.mark.parametrize(
+    "pattern, data, expected",
+    [
+        ([..., "E", "R", "@x", ...], "xxERyERz", [{"x": "y"}, {"x": "z"}]),
+        (["*x", "E", "R", ...], "abERcER", [{"x": "ab"}, {"x": "abERc"}]),
+        ([..., "E", "R", "@x", ...], b"xxERy", []),
+        ([..., 69, 82, "@x", ...], b"xxERy", [{"x": 121}]),
+        ([..., 69, 82, "@x", ...], bytearray(b"ERERy"), [{"x": 69}, {"x": 121}]),
+        ([..., 3, 4, "*x"], (1, 3, 4, 3, 4), [{"x": (3, 4)}, {"x": ()}]),
+        ([..., 3, 4, "*x"], [1, 3, 4, 3, 4], [{"x": [3, 4]}, {"x": []}]),
+        ([..., "ERROR", "@x", ...], ["INFO", "ERROR", "a", "ERROR"], [{"x": "a"}]),
+    ],
+)
+def test_anchors(pattern, data, expected):
+    matcher = as_matcher(pattern)
+    assert matcher.match(data).bindings == expected
+
+
+def test_subject_length():
+    assert as_matcher([1, 2]).match(list(range(100000))).is_match is False
+    assert as_matcher([..., 1, 2, 3]).match([1, 2]).is_match is False
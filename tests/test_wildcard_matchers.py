@@ -13,8 +13,9 @@ def test_builder():
     assert (~pattern).matcher.subclassmatch is True
     assert pattern.and_subclasses.matcher.subclassmatch is True
 
-    pattern.such_as({"x": 3})
-    k, v = list(pattern.matcher.properties)[0]
+    matcher = pattern.such_as({"x": 3})
+    assert pattern.matcher.properties == ()
+    k, v = list(matcher.properties)[0]
     assert k.path == "x"
     assert isinstance(v, LiteralMatcher)
 